@@ -19,8 +19,14 @@
 """Algorithms using backtracking.
 """
 
+import os
 import sys
+import time
 import random
+import itertools
+import multiprocessing
+
+import sequences
 
 NUM_ARGS = 2
 
@@ -32,33 +38,64 @@ NO_QUEEN_VAL = False
 QUEEN_STR_VAL = '*' 
 NO_QUEEN_STR_VAL = 'O'
 
+# Greatest size of the boards solved by main, and greatest number of bits of
+# the numbers printed whole.
+MAX_QUEENS_SIZE = 14
+MAX_PRINT_BITS = 10000
+
+# Modes of n_queens.
+QUEENS_FIRST = "first"
+QUEENS_ALL = "all"
+QUEENS_COUNT = "count"
+
+class QueensSearchError(Exception):
+    """Error in the search of a solution of the queens puzzle."""
+
 def factorial(size):
     
-    if size == 1:
-        return 1
-    else:
-        return size * fibonacci(size - 1) 
+    return sequences.factorial(size)
     
 def fibonacci(size):
+    """Fibonacci numbers with fibonacci(0) = fibonacci(1) = 1, so F(size + 1).
+    """
     
-    if size <= 1:
-        return 1
+    return sequences.fibonacci(size + 1)
+
+def _number_str(n):
+    
+    if n.bit_length() <= MAX_PRINT_BITS:
+        return "%d" % n
     else:
-        return fibonacci(size - 1) + fibonacci(size - 2)
+        return "a number of %d bits" % n.bit_length()
 
 class QueensBoard(object):
     
-    def __init__(self):
+    def __init__(self, size=QUEEN_BOARD_SIZE):
+        
+        self._size = size
         
-        self._board = [[ NO_QUEEN_VAL for _ in range(QUEEN_BOARD_SIZE)] 
-                for _ in range(QUEEN_BOARD_SIZE)]
+        self._board = [[ NO_QUEEN_VAL for _ in range(size)] 
+                for _ in range(size)]
         
-        self._queens_row = [ -1 for _ in range(QUEEN_BOARD_SIZE) ]
+        self._queens_row = [ -1 for _ in range(size) ]
+        
+    @classmethod
+    def from_solution(cls, solution):
+        """Board with the queens of a solution, the row of the queen of 
+        every column.
+        """
+        
+        board = cls(len(solution))
+        
+        for col, row in enumerate(solution):
+            board.set_queen(row, col)
+            
+        return board
         
     def cell_valid_for_queen(self, row, col):
     
-        if row < 0 or row >= QUEEN_BOARD_SIZE or \
-            col < 0 or col >= QUEEN_BOARD_SIZE:
+        if row < 0 or row >= self._size or \
+            col < 0 or col >= self._size:
             return False
         
         queen_found = False
@@ -79,7 +116,7 @@ class QueensBoard(object):
                 if self._board[i_up][j] == QUEEN_VAL:
                     queen_found = True
             i_down = row + h
-            if (not queen_found) and i_down < QUEEN_BOARD_SIZE:
+            if (not queen_found) and i_down < self._size:
                 if self._board[i_down][j] == QUEEN_VAL:
                     queen_found = True
             h += 1
@@ -110,16 +147,15 @@ class QueensBoard(object):
         # Remove the queen from this position.
         self.remove_queen(row_prev_col, prev_col)
         
-        # Check the row in the previous columns isn't the last one.
-        if self.is_last_row(row_prev_col):
+        # Go back while the queen of the column is in its last row.
+        while self.is_last_row(row_prev_col):
             prev_col -= 1
             
-            if prev_col >= 0:
-                row_prev_col = self.find_queen_row(prev_col)
-                self.remove_queen(row_prev_col, prev_col)
-            else:
-                print "ERROR: no column to use, this shouldn't happen!!!"
-                sys.exit(-1)
+            if prev_col < 0:
+                raise QueensSearchError("No previous column to try")
+            
+            row_prev_col = self.find_queen_row(prev_col)
+            self.remove_queen(row_prev_col, prev_col)
             
         # At this point the row found cannot be the last of the column.
         new_row = row_prev_col + 1 
@@ -127,18 +163,18 @@ class QueensBoard(object):
         return new_row, prev_col       
         
     def is_last_col(self, col):
-         return col == QUEEN_BOARD_SIZE -1  
+         return col == self._size -1  
      
     def is_last_row(self, row):
-         return row == QUEEN_BOARD_SIZE -1      
+         return row == self._size -1      
         
     def __str__(self):
         
-        str_board = [[ NO_QUEEN_STR_VAL for _ in range(QUEEN_BOARD_SIZE)] 
-                    for _ in range(QUEEN_BOARD_SIZE)]
+        str_board = [[ NO_QUEEN_STR_VAL for _ in range(self._size)] 
+                    for _ in range(self._size)]
         
-        for i in range(QUEEN_BOARD_SIZE):
-            for j in range(QUEEN_BOARD_SIZE):
+        for i in range(self._size):
+            for j in range(self._size):
                 if self._board[i][j] == QUEEN_VAL:
                     str_board[i][j] = QUEEN_STR_VAL
         
@@ -150,47 +186,578 @@ class QueensBoard(object):
         return '\n'.join(str_list)                    
 
 def eiqht_queens(board, cur_row, cur_col):
+    """Set in board the queens of the first solution from cur_row of cur_col,
+    False if there isn't any. It loops over the cells to try, so it doesn't
+    recurse at every step.
+    """
+    
+    while True:
+        # Check if current position is valid for a queen. 
+        if board.cell_valid_for_queen(cur_row, cur_col):
     
-    # Check if current position is valid for a queen. 
-    if board.cell_valid_for_queen(cur_row, cur_col):
+            board.set_queen(cur_row, cur_col)
+            
+            if board.is_last_col(cur_col):
+                # Finished!!
+                return True
+            
+            # A queen for the next column.
+            cur_row, cur_col = 0, cur_col + 1
+                
+        # Current position is not valid and current row isn't the last one in 
+        # current column.
+        elif not board.is_last_row(cur_row):
+            # Try the next row in current column.
+            cur_row += 1
+            
+        # There is not any cell available in this column.
+        else:
+            # Try a new position in a previous column.
+            try:
+                cur_row, cur_col = board.previous_cell_to_try(cur_col - 1)
+            except QueensSearchError:
+                return False
+            
+def _queens_masks(full, first_rows):
+    """Rows and diagonals attacked by the queens of first_rows in the next 
+    column. Bit i of rows is set when row i has a queen, and bit i of 
+    diag_up / diag_down when a queen attacks row i of the column through a 
+    diagonal, so the free rows are one bit expression.
+    """
+    
+    rows = diag_up = diag_down = 0
+    
+    for row in first_rows:
+        bit = 1 << row
+        rows |= bit
+        diag_up = ((diag_up | bit) << 1) & full
+        diag_down = (diag_down | bit) >> 1
+        
+    return rows, diag_up, diag_down
 
-        board.set_queen(cur_row, cur_col)
+class QueensSearch(object):
+    """Iterator of the solutions of the size queens puzzle that begin with 
+    the queens of first_rows, as tuples with the row of the queen of every 
+    column. The search uses an explicit stack with the rows not tried yet of
+    every column, so its depth is only limited by the memory, and it can be 
+    saved with state and resumed passing it to the constructor.
+    """
+    
+    def __init__(self, size, first_rows=(), state=None):
         
-        if board.is_last_col(cur_col):
-            # Finished!!
-            print board  
-        else:    
-            # A queen for the next column.
-            eiqht_queens(board, 0, cur_col + 1)
+        if size < 0:
+            raise ValueError("The size of the board can't be negative: %d" 
+                             % size)
+        
+        self._size = size
+        self._full = (1 << size) - 1
+        
+        if state is None:
+            placed = list(first_rows)
+            
+            # Only the first_rows of their columns.
+            pending = [ 0 ] * len(placed) 
+            
+            rows, diag_up, diag_down = _queens_masks(self._full, placed)
+            pending.append(self._full & ~(rows | diag_up | diag_down))
+        else:
+            state_size, placed, pending = state
+            
+            # A finished search has nothing in the stack.
+            if state_size != size or \
+                (placed or pending) and len(pending) != len(placed) + 1:
+                raise ValueError("Invalid state of the queens search")
+            
+            placed = list(placed)
+            pending = list(pending)
+            
+        self._placed = placed
+        self._pending = pending
+        
+        # Masks of the queens in the columns before every one in the stack.
+        self._masks = [ _queens_masks(self._full, placed[:col]) 
+                        for col in range(len(pending)) ]
+        
+        # The empty board has a solution, with no queens.
+        self._empty_pending = size == 0 and state is None
+        
+    def state(self):
+        """State to resume the search from the next solution."""
+        
+        return (self._size, tuple(self._placed), tuple(self._pending))
+        
+    def __iter__(self):
+        
+        return self
+    
+    def next(self):
+        
+        if self._empty_pending:
+            self._empty_pending = False
+            return ()
+        
+        full = self._full
+        placed = self._placed
+        pending = self._pending
+        masks = self._masks
+        
+        while pending:
+            free = pending[-1]
+            
+            # No more rows in this column, back to the previous one.
+            if not free:
+                pending.pop()
+                masks.pop()
+                
+                if placed:
+                    placed.pop()
+                    
+                continue
+            
+            # Lowest free row.
+            bit = free & -free
+            pending[-1] = free ^ bit
+            
+            rows, diag_up, diag_down = masks[-1]
+            rows |= bit
+            diag_up = ((diag_up | bit) << 1) & full
+            diag_down = (diag_down | bit) >> 1
+            
+            placed.append(bit.bit_length() - 1)
+            
+            if rows == full:
+                solution = tuple(placed)
+                placed.pop()
+                return solution
+            
+            masks.append((rows, diag_up, diag_down))
+            pending.append(full & ~(rows | diag_up | diag_down))
+            
+        raise StopIteration
+    
+    __next__ = next
+    
+    def take(self, k):
+        """List of the next k solutions at most."""
+        
+        return list(itertools.islice(self, k))
+        
+def _count_queens(full, rows, diag_up, diag_down):
+    """Number of solutions with the queens given by the masks, as in 
+    _queens_masks, without building them.
+    """
+    
+    if rows == full:
+        return 1
+    
+    count = 0
+    free = full & ~(rows | diag_up | diag_down)
+    
+    while free:
+        bit = free & -free
+        free ^= bit
+        
+        count += _count_queens(full, rows | bit, ((diag_up | bit) << 1) & full,
+                               (diag_down | bit) >> 1)
+        
+    return count
+
+def n_queens(size, mode=QUEENS_ALL):
+    """Reference: https://en.wikipedia.org/wiki/Eight_queens_puzzle
+    
+    Solutions of the size queens puzzle, as tuples with the row of the queen 
+    of every column. QUEENS_FIRST returns the first solution, None if there 
+    isn't any, QUEENS_ALL the list of all of them and QUEENS_COUNT only their 
+    number.
+    """
+    
+    if size < 0:
+        raise ValueError("The size of the board can't be negative: %d" % size)
+    
+    full = (1 << size) - 1
+    
+    if mode == QUEENS_COUNT:
+        return _count_queens(full, 0, 0, 0)
+    
+    solutions = QueensSearch(size)
+    
+    if mode == QUEENS_FIRST:
+        return next(solutions, None)
+    elif mode == QUEENS_ALL:
+        return list(solutions)
+    else:
+        raise ValueError("Unknown mode of n_queens: %s" % mode)
+
+class _QueensClasses(object):
+    """Reference: https://en.wikipedia.org/wiki/Eight_queens_puzzle
+    
+    Classes of solutions under rotations and reflections of the size queens 
+    puzzle that begin with the queens of first_rows, searching only one 
+    solution of every class, as in the algorithm of Takaken:
+    
+    - With the first queen in the corner of row 0, the reflection by the 
+      diagonal of the corner keeps it, and only the solution with the queen 
+      of the second column in the lower row is searched. These solutions 
+      have no symmetries, so every class has 8 of them.
+    - Otherwise the first queen is in the lower half of the rows, no queen in
+      a corner, and bound1 is its row. The queens of the first and last rows
+      are kept away from the first columns and the last one, and the 
+      solution found is compared with its rotations, it is counted only when
+      it is the lowest, in a class of 2, 4 or 8 solutions as a rotation of 
+      90, 180 degrees or none keeps it.
+    
+    The masks of the columns are as in _queens_masks, board has the bit of 
+    the row of the queen of every column.
+    """
+    
+    def __init__(self, size, first_rows):
+        
+        self._size = size
+        self._last = size - 1
+        self._full = (1 << size) - 1
+        self._top = 1 << self._last
+        
+        self._first_rows = first_rows
+        self._corner = first_rows[0] == 0
+        
+        # Row of the queen of the second column with the first one in the 
+        # corner, otherwise the one of the first queen.
+        self._bound1 = first_rows[1] if self._corner else first_rows[0]
+        self._bound2 = self._last - self._bound1
+        
+        self._side = self._top | 1
+        self._end_bit = self._top >> self._bound1
+        
+        # Rows of the last column whose solutions have a lower rotation.
+        last_mask = self._side
+        for _ in range(self._bound1 - 1):
+            last_mask |= (last_mask >> 1) | (last_mask << 1)
             
-    # Current position is not valid and current row isn't the last one in 
-    # current column.
-    elif not board.is_last_row(cur_row):
-        # Try the next row in current column.
-        eiqht_queens(board, cur_row + 1, cur_col)
+        self._last_mask = last_mask
+        
+        self._board = [ 1 << row for row in first_rows ] + \
+            [ 0 ] * (size - len(first_rows))
+        
+        self._count2 = self._count4 = self._count8 = 0
+        
+    def _check(self):
+        """Count the solution of the board in its class if it is the lowest 
+        of its rotations.
+        """
+        
+        board = self._board
+        last = self._last
+        
+        # Rotation of 90 degrees.
+        if board[self._bound2] == 1:
+            row_bit = 2
+            for col in range(1, last + 1):
+                bit = 1
+                other = last
+                while board[other] != row_bit and board[col] >= bit:
+                    bit <<= 1
+                    other -= 1
+                    
+                if board[col] > bit:
+                    return
+                if board[col] < bit:
+                    break
+                
+                row_bit <<= 1
+            else:
+                self._count2 += 1
+                return
+            
+        # Rotation of 180 degrees.
+        if board[last] == self._end_bit:
+            for col in range(1, last + 1):
+                bit = 1
+                row_bit = self._top
+                while row_bit != board[last - col] and board[col] >= bit:
+                    bit <<= 1
+                    row_bit >>= 1
+                    
+                if board[col] > bit:
+                    return
+                if board[col] < bit:
+                    break
+            else:
+                self._count4 += 1
+                return
+            
+        # Rotation of 270 degrees.
+        if board[self._bound1] == self._top:
+            row_bit = self._top >> 1
+            for col in range(1, last + 1):
+                bit = 1
+                other = 0
+                while board[other] != row_bit and board[col] >= bit:
+                    bit <<= 1
+                    other += 1
+                    
+                if board[col] > bit:
+                    return
+                if board[col] < bit:
+                    break
+                
+                row_bit >>= 1
+                
+        self._count8 += 1
+        
+    def _search_corner(self, col, rows, diag_up, diag_down):
+        
+        free = self._full & ~(rows | diag_up | diag_down)
+        
+        if col == self._last:
+            if free:
+                self._count8 += 1
+            return
         
-    # There is not any cell available in this column.
+        # The queen of row 1 after the one of the second column.
+        if col < self._bound1:
+            free &= ~2
+            
+        while free:
+            bit = free & -free
+            free ^= bit
+            
+            self._search_corner(col + 1, rows | bit, 
+                                ((diag_up | bit) << 1) & self._full, 
+                                (diag_down | bit) >> 1)
+            
+    def _search(self, col, rows, diag_up, diag_down):
+        
+        free = self._full & ~(rows | diag_up | diag_down)
+        side = self._side
+        
+        if col == self._last:
+            if free and not (free & self._last_mask):
+                self._board[col] = free
+                self._check()
+            return
+        
+        # The queens of the first and last rows not before the column of 
+        # bound1, and one of them in the column of bound2 at most.
+        if col < self._bound1:
+            free &= ~side
+        elif col == self._bound2:
+            if not (rows & side):
+                return
+            if (rows & side) != side:
+                free &= side
+                
+        while free:
+            bit = free & -free
+            free ^= bit
+            
+            self._board[col] = bit
+            self._search(col + 1, rows | bit, 
+                         ((diag_up | bit) << 1) & self._full, 
+                         (diag_down | bit) >> 1)
+            
+    def count(self):
+        """Number of solutions and of classes."""
+        
+        col = len(self._first_rows)
+        masks = _queens_masks(self._full, self._first_rows)
+        
+        if self._corner:
+            self._search_corner(col, *masks)
+        else:
+            self._search(col, *masks)
+            
+        return (2 * self._count2 + 4 * self._count4 + 8 * self._count8, 
+                self._count2 + self._count4 + self._count8)
+    
+    @staticmethod
+    def tasks(size):
+        """First two queens of the searches of the classes of solutions."""
+        
+        last = size - 1
+        side = (1 << last) | 1
+        tasks = []
+        
+        # The first queen in the corner, the second one not in a corner.
+        for row2 in range(2, last):
+            tasks.append((0, row2))
+            
+        for row1 in range(1, size // 2):
+            bit = 1 << row1
+            free = (1 << size) - 1 & ~(bit | (bit << 1) | (bit >> 1))
+            
+            if row1 > 1:
+                free &= ~side
+                
+            for row2 in range(size):
+                if free & (1 << row2):
+                    tasks.append((row1, row2))
+                    
+        return tasks
+
+class QueensTaskResult(object):
+    """Solutions of the subtree of the first two queens of a task of 
+    parallel_count_queens.
+    """
+    
+    def __init__(self, first_rows, count, unique, elapsed, worker):
+        
+        self.first_rows = first_rows
+        self.count = count
+        self.unique = unique
+        self.elapsed = elapsed
+        self.worker = worker
+
+def _count_queens_task(args):
+    
+    size, first_rows, with_unique = args
+    
+    start = time.time()
+    
+    unique = None
+    
+    if with_unique:
+        count, unique = _QueensClasses(size, first_rows).count()
+    else:
+        full = (1 << size) - 1
+        
+        count = _count_queens(full, *_queens_masks(full, first_rows))
+        
+    return QueensTaskResult(first_rows, count, unique, time.time() - start, 
+                            os.getpid())
+
+def _queens_tasks(size):
+    """First two queens of the tasks and their weight. The mirror of a 
+    solution with the first queen in the lower half of the rows has it in 
+    the upper half, so only the lower half is searched and counted twice. 
+    With an odd size and the first queen in the middle row the same is done
+    with the second queen.
+    """
+    
+    half = size // 2
+    tasks = []
+    
+    for row1 in range(half):
+        for row2 in range(size):
+            if abs(row2 - row1) > 1:
+                tasks.append(((row1, row2), 2))
+                
+    if size % 2:
+        for row2 in range(half - 1):
+            tasks.append(((half, row2), 2))
+            
+    return tasks
+
+def parallel_count_queens(size, num_workers=None, with_unique=False):
+    """Number of solutions of the size queens puzzle counted in a pool of 
+    processes, every one searching the subtrees of the first two queens of 
+    some tasks. Only the solutions with the first queen in the lower half of
+    the rows are searched, the other ones are their mirrors. with_unique 
+    also counts the solutions distinct under rotations and reflections, 
+    searching only one solution of every class, with _QueensClasses, what 
+    is faster than the plain count. Returns the number of solutions, the 
+    unique ones (None without with_unique) and a QueensTaskResult for every 
+    task.
+    """
+    
+    if size < 0:
+        raise ValueError("The size of the board can't be negative: %d" % size)
+    
+    # Boards too small to split by the first two queens.
+    if size < 2:
+        return 1, 1 if with_unique else None, []
+    
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+        
+    # The counts of the classes are already weighted by their sizes.
+    if with_unique:
+        tasks = [ (first_rows, 1) 
+                  for first_rows in _QueensClasses.tasks(size) ]
     else:
-        # Try a new position in a previous column.
-        new_row, new_col = board.previous_cell_to_try(cur_col - 1)      
+        tasks = _queens_tasks(size)
+        
+    weights = dict(tasks)
+    
+    total = 0
+    unique = 0 if with_unique else None
+    results = []
+    
+    pool = multiprocessing.Pool(num_workers)
+    
+    try:
+        for res in pool.imap_unordered(_count_queens_task, 
+                                       [ (size, first_rows, with_unique) 
+                                         for first_rows, _ in tasks ]):
+            total += weights[res.first_rows] * res.count
             
-        eiqht_queens(board, new_row, new_col)                    
+            if with_unique:
+                unique += res.unique
+                
+            results.append(res)
+    finally:
+        pool.terminate()
+        
+    return total, unique, results
+
+def resolve_n_queens(size, with_unique=False):
+    
+    print "%d queens:" % size
+    
+    solution = n_queens(size, QUEENS_FIRST)
+    
+    if solution is None:
+        print "There isn't any solution."
+    else:
+        print QueensBoard.from_solution(solution)
+        
+        start = time.time()
+        count = n_queens(size, QUEENS_COUNT)
+        end = time.time()
+        
+        print "%d solutions counted in %g s" % (count, end - start)
+        
+        start = time.time()
+        count, unique, results = parallel_count_queens(size, 
+                                                       with_unique=with_unique)
+        end = time.time()
+        
+        if with_unique:
+            print "%d solutions, %d unique, counted in parallel in %g s" % \
+                (count, unique, end - start)
+        else:
+            print "%d solutions counted in parallel in %g s" % \
+                (count, end - start)
+        
+        # Time of the tasks of every worker.
+        workers = {}
+        for res in results:
+            workers.setdefault(res.worker, []).append(res.elapsed)
             
+        for worker, times in sorted(workers.items()):
+            print "Worker %d: %d tasks in %g s, the longest %g s" % \
+                (worker, len(times), sum(times), max(times))
+
 def resolve_eight_queens():
     
     print "Eight queens:"
     board = QueensBoard()
     
-    eiqht_queens(board, 0, 0)    
+    if eiqht_queens(board, 0, 0):
+        print board
+    else:
+        print "There isn't any solution."
 
 def main(size):
     
-    print "Factorial of %d is: %d" % (size, factorial(size))
+    print "Factorial of %d is: %s" % (size, _number_str(factorial(size)))
     
-    print "Fibonacci of %d is: %d" % (size, fibonacci(size))       
+    print "Fibonacci of %d is: %s" % (size, _number_str(fibonacci(size)))
     
     resolve_eight_queens() 
     
+    if size <= MAX_QUEENS_SIZE:
+        resolve_n_queens(size)
+    
     return 0
 
 if __name__ == "__main__":
@@ -0,0 +1,411 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Felipe Gallego. All rights reserved.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Exact cover problems solved with Knuth's Algorithm X and Dancing Links, and
+the queens puzzle and sudoku expressed as exact cover problems.
+"""
+
+import time
+
+QUEENS_SIZE = 8
+
+# A sudoku with only 17 clues, 0 is an empty cell.
+SUDOKU_EXAMPLE = [ [ 0, 0, 0, 0, 0, 0, 0, 1, 0 ],
+                   [ 4, 0, 0, 0, 0, 0, 0, 0, 0 ],
+                   [ 0, 2, 0, 0, 0, 0, 0, 0, 0 ],
+                   [ 0, 0, 0, 0, 5, 0, 4, 0, 7 ],
+                   [ 0, 0, 8, 0, 0, 0, 3, 0, 0 ],
+                   [ 0, 0, 1, 0, 9, 0, 0, 0, 0 ],
+                   [ 3, 0, 0, 4, 0, 0, 2, 0, 0 ],
+                   [ 0, 5, 0, 1, 0, 0, 0, 0, 0 ],
+                   [ 0, 0, 0, 8, 0, 6, 0, 0, 0 ] ]
+
+class ExactCover(object):
+    """Reference: https://en.wikipedia.org/wiki/Dancing_Links
+
+    Choose rows, lists of columns, so every primary column is in exactly one
+    of them and every secondary column in one at most. The columns from
+    num_primary are the secondary ones, all of them are primary by default.
+    As in Algorithm X, rows with only secondary columns are never chosen.
+
+    The matrix is stored as Dancing Links in arrays of integers, a node for
+    every column header, with the root at 0, and for every item of the rows.
+    left, right, up and down are the links of every node, column its column
+    header and row_of the row of the items. Covering a column unlinks its
+    header and the rows that have it, and uncovering it restores the links
+    in reverse order.
+
+    The column with the fewest rows is chosen first. nodes counts the
+    partial solutions visited and backtracks the dead ends of the last
+    search.
+    """
+
+    def __init__(self, num_columns, rows, num_primary=None):
+
+        if num_primary is None:
+            num_primary = num_columns
+
+        self.num_columns = num_columns
+        self.num_rows = len(rows)
+
+        n = num_columns + 1
+
+        # The headers, only the primary ones linked to the root.
+        self._left = [ i - 1 for i in range(n) ]
+        self._right = [ i + 1 for i in range(n) ]
+        self._left[0] = num_primary
+        self._right[num_primary] = 0
+
+        for i in range(num_primary + 1, n):
+            self._left[i] = self._right[i] = i
+
+        self._up = range(n)
+        self._down = range(n)
+        self._column = range(n)
+        self._row_of = [ -1 ] * n
+        self._size = [ 0 ] * n
+
+        for row_idx, row in enumerate(rows):
+            self._add_row(row_idx, row)
+
+        self.nodes = 0
+        self.backtracks = 0
+
+    def _add_row(self, row_idx, row):
+
+        first = None
+
+        for col in row:
+            if not 0 <= col < self.num_columns:
+                raise ValueError("Column %d out of range in row %d" %
+                                 (col, row_idx))
+
+            header = col + 1
+            node = len(self._column)
+
+            # At the bottom of its column.
+            self._column.append(header)
+            self._row_of.append(row_idx)
+            self._up.append(self._up[header])
+            self._down.append(header)
+            self._down[self._up[header]] = node
+            self._up[header] = node
+            self._size[header] += 1
+
+            # At the end of its row.
+            if first is None:
+                first = node
+                self._left.append(node)
+                self._right.append(node)
+            else:
+                self._left.append(self._left[first])
+                self._right.append(first)
+                self._right[self._left[first]] = node
+                self._left[first] = node
+
+    def _cover(self, header):
+
+        left = self._left
+        right = self._right
+        up = self._up
+        down = self._down
+        column = self._column
+        size = self._size
+
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+
+        i = down[header]
+        while i != header:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, header):
+
+        left = self._left
+        right = self._right
+        up = self._up
+        down = self._down
+        column = self._column
+        size = self._size
+
+        i = up[header]
+        while i != header:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+
+        right[left[header]] = header
+        left[right[header]] = header
+
+    def _choose_column(self):
+        """Primary column with the fewest rows."""
+
+        right = self._right
+        size = self._size
+
+        best = right[0]
+        best_size = size[best]
+
+        header = right[best]
+        while header != 0 and best_size > 1:
+            if size[header] < best_size:
+                best = header
+                best_size = size[header]
+            header = right[header]
+
+        return best
+
+    def _release_row(self, node):
+        """Uncover the other columns of the row of node, in reverse order."""
+
+        left = self._left
+        column = self._column
+
+        j = left[node]
+        while j != node:
+            self._uncover(column[j])
+            j = left[j]
+
+    def _search(self, build):
+        """Generator of the solutions, the lists of their rows if build,
+        otherwise None. The search uses an explicit stack with the node of
+        the row chosen for every column covered. The links are restored
+        when the search ends or the generator is closed before its end.
+        """
+
+        right = self._right
+        down = self._down
+        column = self._column
+
+        self.nodes = 0
+        self.backtracks = 0
+
+        chosen = []
+        columns = []
+        forward = True
+
+        try:
+            while True:
+                if forward:
+                    self.nodes += 1
+
+                    # Every primary column covered.
+                    if right[0] == 0:
+                        yield [ self._row_of[r] for r in chosen ] if build \
+                            else None
+                        forward = False
+                        continue
+
+                    header = self._choose_column()
+
+                    if not self._size[header]:
+                        self.backtracks += 1
+                        forward = False
+                        continue
+
+                    self._cover(header)
+                    columns.append(header)
+                    node = down[header]
+                else:
+                    if not columns:
+                        return
+
+                    # Release the row chosen for the last column, try the
+                    # next.
+                    header = columns[-1]
+                    node = chosen.pop()
+
+                    self._release_row(node)
+
+                    node = down[node]
+
+                # No more rows for this column.
+                if node == header:
+                    self._uncover(header)
+                    columns.pop()
+                    self.backtracks += 1
+                    forward = False
+                    continue
+
+                chosen.append(node)
+
+                j = right[node]
+                while j != node:
+                    self._cover(column[j])
+                    j = right[j]
+
+                forward = True
+        finally:
+            while columns:
+                if len(chosen) == len(columns):
+                    self._release_row(chosen.pop())
+
+                self._uncover(columns.pop())
+
+    def solutions(self):
+        """Generator of the solutions as lists with the indexes of their
+        rows.
+        """
+
+        return self._search(True)
+
+    def first_solution(self):
+        """The first solution, None if there isn't any."""
+
+        return next(self._search(True), None)
+
+    def count(self, limit=None):
+        """Number of solutions, stopping at limit if it is given."""
+
+        count = 0
+
+        for _ in self._search(False):
+            count += 1
+
+            if count == limit:
+                break
+
+        return count
+
+def queens_exact_cover(size):
+    """The size queens puzzle as an exact cover problem and the (row, col) of
+    the queen of every row of the problem. The primary columns are the rows
+    and columns of the board, the secondary ones its diagonals.
+    """
+
+    num_diags = max(2 * size - 1, 0)
+
+    rows = []
+    cells = []
+
+    for row in range(size):
+        for col in range(size):
+            rows.append([ row, size + col, 2 * size + row + col,
+                          2 * size + num_diags + row - col + size - 1 ])
+            cells.append((row, col))
+
+    return ExactCover(2 * size + 2 * num_diags, rows, 2 * size), cells
+
+def queens_solutions(size):
+    """Generator of the solutions of the queens puzzle as tuples with the row
+    of the queen of every column, as in backtracking.
+    """
+
+    problem, cells = queens_exact_cover(size)
+
+    for solution in problem.solutions():
+        queens_row = [ 0 ] * size
+
+        for row_idx in solution:
+            row, col = cells[row_idx]
+            queens_row[col] = row
+
+        yield tuple(queens_row)
+
+def sudoku_exact_cover(grid):
+    """The sudoku of grid, a list of n lists of n digits with 0 for the empty
+    cells and n the square of the size of its boxes, as an exact cover
+    problem and the (row, col, digit) of every row of the problem. The
+    columns are the cells, and every digit in every row, column and box.
+    """
+
+    n = len(grid)
+    box = int(round(n ** 0.5))
+
+    if box * box != n or any(len(grid_row) != n for grid_row in grid):
+        raise ValueError("A sudoku must be a square of n x n with n a square")
+
+    rows = []
+    candidates = []
+
+    for r in range(n):
+        for c in range(n):
+            b = (r // box) * box + c // box
+            digits = [ grid[r][c] ] if grid[r][c] else range(1, n + 1)
+
+            for d in digits:
+                rows.append([ r * n + c, n * n + r * n + d - 1,
+                              2 * n * n + c * n + d - 1,
+                              3 * n * n + b * n + d - 1 ])
+                candidates.append((r, c, d))
+
+    return ExactCover(4 * n * n, rows), candidates
+
+def _sudoku_grid(size, candidates, solution):
+
+    grid = [ [ 0 ] * size for _ in range(size) ]
+
+    for row_idx in solution:
+        r, c, d = candidates[row_idx]
+        grid[r][c] = d
+
+    return grid
+
+def sudoku_solutions(grid):
+    """Generator of the solutions of the sudoku of grid, as grids."""
+
+    problem, candidates = sudoku_exact_cover(grid)
+
+    for solution in problem.solutions():
+        yield _sudoku_grid(len(grid), candidates, solution)
+
+def solve_sudoku(grid):
+    """The first solution of the sudoku of grid, None if there isn't any."""
+
+    return next(sudoku_solutions(grid), None)
+
+def main():
+
+    print "- %d queens as exact cover:" % QUEENS_SIZE
+
+    problem, _ = queens_exact_cover(QUEENS_SIZE)
+
+    start = time.time()
+    count = problem.count()
+    end = time.time()
+
+    print "%d solutions, %d nodes, %d backtracks in %g s" % \
+        (count, problem.nodes, problem.backtracks, end - start)
+
+    print "- Sudoku as exact cover:"
+
+    problem, candidates = sudoku_exact_cover(SUDOKU_EXAMPLE)
+
+    start = time.time()
+    solution = problem.first_solution()
+    end = time.time()
+
+    print "Solved with %d nodes, %d backtracks in %g s" % \
+        (problem.nodes, problem.backtracks, end - start)
+
+    for row in _sudoku_grid(len(SUDOKU_EXAMPLE), candidates, solution):
+        print ' '.join(str(d) for d in row)
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Felipe Gallego. All rights reserved.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""External merge sort, sorts files with one record per line that don't fit
+in memory. See https://en.wikipedia.org/wiki/External_sorting
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import sorting
+
+NUM_ARGS = 3
+
+MEMORY_BUDGET = 64 * 1024 * 1024
+FAN_IN = 16
+BUFFER_SIZE = 1024 * 1024
+
+RANDOM_FILE_ELTS = 1000000
+
+class PassStats(object):
+    """Bytes read and written and runs produced in a pass of the sort."""
+
+    def __init__(self, name):
+
+        self.name = name
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.runs = 0
+        self.elapsed = 0.0
+
+    def __str__(self):
+
+        return "%s: %d runs, %d bytes read, %d bytes written in %g s" % \
+            (self.name, self.runs, self.bytes_read, self.bytes_written,
+             self.elapsed)
+
+def _strip_newline(line):
+    """The line without its terminator, '\n' or '\r\n'."""
+
+    if line.endswith('\n'):
+        line = line[:-1]
+
+        if line.endswith('\r'):
+            line = line[:-1]
+
+    return line
+
+def _read_records(file_name, parse, stats):
+    """Yield the records of a file counting the bytes read."""
+
+    with open(file_name, 'rb', BUFFER_SIZE) as f:
+        for line in f:
+            stats.bytes_read += len(line)
+
+            yield parse(_strip_newline(line))
+
+def _write_records(file_name, records, format, stats):
+    """Write the records incrementally to a file, a line with format(rec) for
+    every one, counting the bytes written.
+    """
+
+    with open(file_name, 'wb', BUFFER_SIZE) as f:
+        for rec in records:
+            line = format(rec) + '\n'
+
+            f.write(line)
+
+            stats.bytes_written += len(line)
+
+def _new_run_name(tmp_dir, run_id):
+
+    return os.path.join(tmp_dir, "run_%06d.txt" % run_id)
+
+def make_runs(input_file, tmp_dir, parse, format, memory_budget, sort_fun,
+              stats):
+    """Read the input in chunks of at most memory_budget bytes, sort each one
+    with sort_fun and write it to a temporary run file.
+
+    The budget is measured in bytes of the input, the memory used by the
+    Python objects of a chunk is a few times greater.
+    """
+
+    run_names = []
+    chunk = []
+    chunk_bytes = 0
+
+    with open(input_file, 'rb', BUFFER_SIZE) as f:
+        for line in f:
+            stats.bytes_read += len(line)
+
+            chunk.append(parse(_strip_newline(line)))
+            chunk_bytes += len(line)
+
+            if chunk_bytes >= memory_budget:
+                run_names.append(_new_run_name(tmp_dir, len(run_names)))
+
+                sorted_chunk, _ = sort_fun(chunk)
+                _write_records(run_names[-1], sorted_chunk, format, stats)
+
+                chunk = []
+                chunk_bytes = 0
+
+    if chunk or not run_names:
+        run_names.append(_new_run_name(tmp_dir, len(run_names)))
+
+        sorted_chunk, _ = sort_fun(chunk)
+        _write_records(run_names[-1], sorted_chunk, format, stats)
+
+    stats.runs = len(run_names)
+
+    return run_names
+
+def merge_runs(run_names, output_file, parse, format, stats):
+    """Merge the sorted run files into output_file with a k-way merge."""
+
+    runs = [ _read_records(name, parse, stats) for name in run_names ]
+
+    _write_records(output_file, sorting.k_way_merge(runs), format, stats)
+
+    stats.runs = 1
+
+def external_sort(input_file, output_file, parse=int, format=str,
+                  memory_budget=MEMORY_BUDGET, fan_in=FAN_IN,
+                  sort_fun=sorting.tim_sort):
+    """Sort the records of input_file, one per line, and write them to
+    output_file.
+
+    parse builds a record from a line without its terminator and format
+    returns the line of a record, the inverse of parse, used for the runs
+    and the output, so records of any type can be sorted as long as their
+    lines have no newlines.
+
+    The runs are merged fan_in at a time, so several merge passes are done
+    when there are more runs than fan_in. Returns the list of PassStats of
+    every pass.
+    """
+
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+
+    all_stats = []
+    tmp_dir = tempfile.mkdtemp(prefix="external_sort_")
+
+    try:
+        start = time.time()
+        stats = PassStats("Pass 0 (runs)")
+        run_names = make_runs(input_file, tmp_dir, parse, format,
+                              memory_budget, sort_fun, stats)
+        stats.elapsed = time.time() - start
+        all_stats.append(stats)
+
+        run_id = len(run_names)
+
+        # Intermediate passes while the runs can't be merged in one go.
+        while len(run_names) > fan_in:
+            start = time.time()
+            stats = PassStats("Pass %d (merge)" % len(all_stats))
+            new_run_names = []
+
+            for i in range(0, len(run_names), fan_in):
+                new_run_names.append(_new_run_name(tmp_dir, run_id))
+                run_id += 1
+
+                merge_runs(run_names[i:i + fan_in], new_run_names[-1], parse,
+                           format, stats)
+
+                for name in run_names[i:i + fan_in]:
+                    os.remove(name)
+
+            run_names = new_run_names
+            stats.runs = len(run_names)
+            stats.elapsed = time.time() - start
+            all_stats.append(stats)
+
+        start = time.time()
+        stats = PassStats("Pass %d (final merge)" % len(all_stats))
+        merge_runs(run_names, output_file, parse, format, stats)
+        stats.elapsed = time.time() - start
+        all_stats.append(stats)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return all_stats
+
+def generate_random_file(file_name, num_elts=RANDOM_FILE_ELTS):
+
+    random.seed(sorting.THE_SEED)
+
+    with open(file_name, 'wb', BUFFER_SIZE) as f:
+        for _ in xrange(num_elts):
+            f.write("%d\n" % random.randint(0, 10 * num_elts))
+
+def main(input_file, output_file, memory_budget, fan_in):
+
+    if not os.path.exists(input_file):
+        print "Generating %s with %d random integers ..." % \
+            (input_file, RANDOM_FILE_ELTS)
+        generate_random_file(input_file)
+
+    print "Sorting %s into %s (memory budget %d bytes, fan-in %d)" % \
+        (input_file, output_file, memory_budget, fan_in)
+
+    for stats in external_sort(input_file, output_file, int, str,
+                               memory_budget, fan_in):
+        print stats
+
+    return 0
+
+if __name__ == "__main__":
+
+    if len(sys.argv) < NUM_ARGS:
+        print "ERROR: Use: %s input_file output_file [memory_budget] [fan_in]" \
+            % sys.argv[0]
+    else:
+        memory_budget = int(sys.argv[3]) if len(sys.argv) > 3 else MEMORY_BUDGET
+        fan_in = int(sys.argv[4]) if len(sys.argv) > 4 else FAN_IN
+
+        sys.exit(main(sys.argv[1], sys.argv[2], memory_budget, fan_in))
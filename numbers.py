@@ -22,9 +22,64 @@
 import sys
 import math
 import time
+import ctypes
+import binascii
+import multiprocessing
+
+from array import array
+from collections import OrderedDict, deque
+from itertools import compress, islice
+from multiprocessing.sharedctypes import RawArray
 
 NUM_ARGS = 3
 
+# Odd numbers in every segment of the segmented sieve, one byte each.
+SEGMENT_SIZE = 1 << 18
+
+# Odd numbers in every segment of the parallel sieve, a multiple of 8 so 
+# their bits fill whole bytes, and slots of shared memory for the bits of the
+# segments of every worker.
+PARALLEL_SEGMENT_SIZE = 1 << 21
+SLOTS_PER_WORKER = 2
+
+# Primes used to prefilter the primality tests, and Miller-Rabin bases that 
+# are deterministic for numbers lower than 2^64 (actually up to 3.3 * 10^24).
+SMALL_PRIMES_LIMIT = 1000
+MR_BASES = [ 2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37 ]
+MR_DETERMINISTIC_LIMIT = 1 << 64
+
+# Type of the arrays of integers of the batch GCD, C longs that are 64 bits
+# integers in Linux.
+INT_TYPECODE = 'l'
+
+# Products of differences of Pollard-Brent rho multiplied before every GCD,
+# and factorizations kept by factorize for repeated numbers.
+RHO_BATCH = 128
+FACTOR_CACHE_SIZE = 4096
+
+# Translations between bytes 0 / 1 and the characters '0' / '1'.
+_BYTES_TO_BITS = ''.join(chr(i) for i in range(256)).replace('\x00', '0') \
+    .replace('\x01', '1')
+_BITS_TO_BYTES = ''.join(chr(i) for i in range(256)).replace('0', '\x00') \
+    .replace('1', '\x01')
+
+def _isqrt(n):
+    """Integer square root, exact for any size of n unlike math.sqrt."""
+    
+    if n < 0:
+        raise ValueError("square root of a negative number")
+    
+    if n == 0:
+        return 0
+    
+    x = 1 << ((n.bit_length() + 1) >> 1)
+    
+    while True:
+        y = (x + n // x) >> 1
+        if y >= x:
+            return x
+        x = y
+
 def euclides(n1, n2):
     """Reference: https://en.wikipedia.org/wiki/Euclidean_algorithm
     """
@@ -100,23 +155,544 @@ def gcd_mcm(n1, n2):
         print "GCD with Binary GCD is: %d (with %d iterations)" \
             % binary_gcd(n1, n2)
             
-        print "MCM is %d" % ( n1 * n2 / gcd)
+        print "MCM is %d" % ( n1 // gcd * n2)
     else:    
         print "For GCD arguments must be integer numbers greater than 0."
         
+def _is_ndarray(values):
+    """Check for a NumPy array without importing NumPy, that can't be 
+    imported from this directory because this module hides the standard 
+    module numbers. The batch functions only use the operators of the arrays.
+    """
+    
+    return hasattr(values, "__array_interface__")
+
+def _is_scalar(values):
+    """A single number, a NumPy array of 0 dimensions too."""
+    
+    return not hasattr(values, "__len__") or getattr(values, "ndim", 1) == 0
+
+def _int_buffer(values):
+    """Compact array with the integers, a list if they don't fit in it."""
+    
+    try:
+        return array(INT_TYPECODE, values)
+    except OverflowError:
+        return list(values)
+
+def _gcd_many_ndarray(a_values, b_values):
+    """Euclid's algorithm for all the pairs at once, every step computes the 
+    remainders of the pairs whose GCD isn't found yet.
+    """
+    
+    a = abs(a_values).copy()
+    b = abs(b_values).copy()
+    
+    # The greatest first, as euclides_div.
+    swap = (a < b).nonzero()[0]
+    a[swap], b[swap] = b[swap], a[swap]
+    
+    it = 0
+    active = (b != 0).nonzero()[0]
+    
+    while len(active):
+        a_act = a[active]
+        b_act = b[active]
+        
+        a[active] = b_act
+        b[active] = a_act % b_act
+        
+        it += len(active)
+        
+        active = active[(b[active] != 0).nonzero()[0]]
+        
+    return a, it
+
+def gcd_many(a_values, b_values, count_it=False):
+    """GCD of every pair of a_values and b_values. NumPy arrays are processed
+    with vectorized steps of Euclid's algorithm and return a NumPy array, 
+    other sequences return an array of C longs. With count_it returns too 
+    the total of iterations of all the pairs.
+    """
+    
+    if _is_ndarray(a_values) or _is_ndarray(b_values):
+        if not (_is_scalar(a_values) or _is_scalar(b_values)) and \
+            len(a_values) != len(b_values):
+            raise ValueError("a_values and b_values must have the same "
+                             "length")
+        
+        # Broadcast the other argument to a NumPy array, only a scalar can 
+        # have a shape different from the array.
+        if _is_scalar(a_values) or not _is_ndarray(a_values):
+            a_values = b_values * 0 + a_values
+        if _is_scalar(b_values) or not _is_ndarray(b_values):
+            b_values = a_values * 0 + b_values
+            
+        if a_values.shape != b_values.shape:
+            raise ValueError("a_values and b_values must have the same "
+                             "shape")
+        
+        result, it = _gcd_many_ndarray(a_values, b_values)
+    else:
+        if len(a_values) != len(b_values):
+            raise ValueError("a_values and b_values must have the same "
+                             "length")
+        
+        result = []
+        it = 0
+        
+        for n1, n2 in zip(a_values, b_values):
+            gcd, gcd_it = euclides_div(abs(n1), abs(n2))
+            result.append(gcd)
+            it += gcd_it
+            
+        result = _int_buffer(result)
+        
+    return (result, it) if count_it else result
+
+def lcm_many(a_values, b_values):
+    """LCM of every pair of a_values and b_values, computed as 
+    a // gcd(a, b) * b so the intermediate values aren't greater than the 
+    result. When a result doesn't fit in the integers of the arrays the 
+    results are Python integers, in a NumPy array of objects or a list.
+    """
+    
+    gcds = gcd_many(a_values, b_values)
+    
+    if _is_ndarray(gcds):
+        a = abs(gcds * 0 + a_values)
+        b = abs(gcds * 0 + b_values)
+        
+        nonzero = gcds != 0
+        quotients = a * 0
+        quotients[nonzero] = a[nonzero] // gcds[nonzero]
+        
+        # Overflow when quotient * b is greater than the maximum of the type
+        # of the array, without the sign bit for signed types.
+        dtype = gcds.dtype
+        
+        if dtype.kind in 'iu':
+            max_int = (1 << (8 * dtype.itemsize - (dtype.kind == 'i'))) - 1
+            nonzero = b != 0
+            
+            if (quotients[nonzero] > max_int // b[nonzero]).any():
+                quotients = quotients.astype(object)
+                b = b.astype(object)
+            
+        return quotients * b
+    
+    result = [ abs(n1) // gcd * abs(n2) if gcd else 0 
+               for n1, n2, gcd in zip(a_values, b_values, gcds) ]
+    
+    return _int_buffer(result)
+
+def gcd_reduce(values, count_it=False):
+    """GCD of all the values, it stops as soon as the GCD is 1. With 
+    count_it returns too the total of iterations.
+    """
+    
+    it = 0
+    
+    if _is_ndarray(values):
+        # Reduce by halves, the GCD of the pairs of every half at once.
+        values = abs(values)
+        
+        while len(values) > 1 and not (values == 1).any():
+            half = len(values) // 2
+            
+            gcds, gcd_it = _gcd_many_ndarray(values[:half], 
+                                             values[half:2 * half])
+            it += gcd_it
+            
+            if len(values) % 2:
+                gcds = gcds.tolist() + [ values[-1] ]
+                gcds = values[:len(gcds)] * 0 + gcds
+                
+            values = gcds
+            
+        if not len(values):
+            gcd = 0
+        elif (values == 1).any():
+            gcd = 1
+        else:
+            gcd = int(values[0])
+    else:
+        gcd = 0
+        
+        for n in values:
+            gcd, gcd_it = euclides_div(gcd, abs(n))
+            it += gcd_it
+            
+            if gcd == 1:
+                break
+        
+    return (gcd, it) if count_it else gcd
+
+def lcm_reduce(values):
+    """LCM of all the values as a Python integer, so it can't overflow."""
+    
+    lcm = 1
+    
+    for n in values:
+        n = abs(int(n))
+        
+        if not n:
+            return 0
+        
+        gcd, _ = euclides_div(lcm, n)
+        lcm = lcm // gcd * n
+        
+    return lcm
+
+def _small_primes():
+    """Primes lower than SMALL_PRIMES_LIMIT as a list, a set and their 
+    product, computed the first time they are needed.
+    """
+    
+    if not _small_primes_cache:
+        small_primes = [ 2 ] + _odd_primes_until(SMALL_PRIMES_LIMIT - 1)
+        
+        product = 1
+        for p in small_primes:
+            product *= p
+            
+        _small_primes_cache.extend([ small_primes, frozenset(small_primes),
+                                     product ])
+        
+    return _small_primes_cache
+
+def _prefilter(n, small_primes_set, small_primes_product):
+    """Primality of n from its small factors, None if they don't decide it.
+    """
+    
+    if n < SMALL_PRIMES_LIMIT:
+        return n in small_primes_set
+    
+    # A common factor with the product of the small primes is a small 
+    # factor of n.
+    gcd, _ = euclides_div(n, small_primes_product % n)
+    if gcd != 1:
+        return False
+    
+    if n < SMALL_PRIMES_LIMIT * SMALL_PRIMES_LIMIT:
+        return True
+    
+    return None
+
+def _strong_probable_prime(n, a, d, s):
+    """Miller-Rabin test of n to base a, with n - 1 = d * 2^s and d odd."""
+    
+    x = pow(a, d, n)
+    
+    if x == 1 or x == n - 1:
+        return True
+    
+    for _ in xrange(s - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+        
+    return False
+
+def _jacobi(a, n):
+    """Reference: https://en.wikipedia.org/wiki/Jacobi_symbol
+    """
+    
+    a %= n
+    result = 1
+    
+    while a:
+        while not a & 1:
+            a >>= 1
+            if n & 7 in (3, 5):
+                result = -result
+                
+        a, n = n, a
+        
+        if a & 3 == 3 and n & 3 == 3:
+            result = -result
+            
+        a %= n
+        
+    return result if n == 1 else 0
+
+def _strong_lucas_probable_prime(n):
+    """Reference: https://en.wikipedia.org/wiki/Lucas_pseudoprime#Strong_Lucas_pseudoprimes
+    
+    Strong Lucas test with the parameters of Selfridge's method A, n must be
+    odd and not a perfect square.
+    """
+    
+    # First D of 5, -7, 9, -11, ... with Jacobi symbol (D/n) = -1.
+    D = 5
+    while True:
+        j = _jacobi(D, n)
+        if j == -1:
+            break
+        if j == 0 and abs(D) != n:
+            return False
+        D = -D - 2 if D > 0 else -D + 2
+        
+    P = 1
+    Q = (1 - D) // 4
+    
+    # n + 1 = d * 2^s with d odd.
+    d = n + 1
+    s = 0
+    while not d & 1:
+        d >>= 1
+        s += 1
+        
+    # U_d, V_d and Q^d with the binary expansion of d.
+    U = 1
+    V = P
+    Qk = Q % n
+    
+    for bit in bin(d)[3:]:
+        U = U * V % n
+        V = (V * V - 2 * Qk) % n
+        Qk = Qk * Qk % n
+        
+        if bit == '1':
+            U, V = (P * U + V) % n, (D * U + P * V) % n
+            
+            # Divide by 2 modulo n.
+            if U & 1:
+                U += n
+            U >>= 1
+            if V & 1:
+                V += n
+            V >>= 1
+            
+            Qk = Qk * Q % n
+            
+    if U == 0 or V == 0:
+        return True
+    
+    for _ in xrange(s - 1):
+        V = (V * V - 2 * Qk) % n
+        Qk = Qk * Qk % n
+        
+        if V == 0:
+            return True
+        
+    return False
+
+def _is_prime_after_prefilter(n):
+    """Miller-Rabin with deterministic bases for n < 2^64, BPSW for greater 
+    n. n must be odd and have no small factors.
+    """
+    
+    d = n - 1
+    s = 0
+    while not d & 1:
+        d >>= 1
+        s += 1
+        
+    if n < MR_DETERMINISTIC_LIMIT:
+        return all(_strong_probable_prime(n, a, d, s) for a in MR_BASES)
+    
+    # Baillie-PSW, Miller-Rabin to base 2 and strong Lucas test.
+    if not _strong_probable_prime(n, 2, d, s):
+        return False
+    
+    root = _isqrt(n)
+    if root * root == n:
+        return False
+    
+    return _strong_lucas_probable_prime(n)
+
 def is_prime(n):
+    """Reference: https://en.wikipedia.org/wiki/Miller%E2%80%93Rabin_primality_test
     
-    is_prim = True
+    Prefilter with the small primes, then Miller-Rabin with bases that are 
+    deterministic for n < 2^64, and Baillie-PSW for greater n, with no known
+    pseudoprimes. Reference: https://en.wikipedia.org/wiki/Baillie%E2%80%93PSW_primality_test
+    """
     
-    if n > 1:
-        root = int(math.sqrt(n) + 0.1) + 1
+    if n < 2:
+        return False
+    
+    _, small_primes_set, small_primes_product = _small_primes()
+    
+    is_prim = _prefilter(n, small_primes_set, small_primes_product)
+    
+    if is_prim is None:
+        is_prim = _is_prime_after_prefilter(n)
         
-        for i in range(2, root):
-            if n % i == 0:
+    return is_prim
+
+def is_prime_many(iterable):
+    """is_prime for every number of iterable, returned as a list. The small 
+    primes are retrieved once for all the batch and repeated numbers are 
+    tested only once.
+    """
+    
+    _, small_primes_set, small_primes_product = _small_primes()
+    
+    known = {}
+    results = []
+    
+    for n in iterable:
+        is_prim = known.get(n)
+        
+        if is_prim is None:
+            if n < 2:
                 is_prim = False
-                break
+            else:
+                is_prim = _prefilter(n, small_primes_set, small_primes_product)
+                
+                if is_prim is None:
+                    is_prim = _is_prime_after_prefilter(n)
+                    
+            known[n] = is_prim
+            
+        results.append(is_prim)
+        
+    return results
+
+def _pollard_brent(n, c):
+    """Reference: https://en.wikipedia.org/wiki/Pollard%27s_rho_algorithm#Variants
+    
+    A factor of the composite n with the sequence x^2 + c, Brent's cycle 
+    detection and the products of RHO_BATCH differences modulo n for every 
+    GCD. It returns n when it fails, to try again with another c.
+    """
+    
+    y = 2
+    r = 1
+    q = 1
+    g = 1
+    
+    while g == 1:
+        x = y
+        for _ in xrange(r):
+            y = (y * y + c) % n
+            
+        k = 0
+        while k < r and g == 1:
+            ys = y
+            
+            for _ in xrange(min(RHO_BATCH, r - k)):
+                y = (y * y + c) % n
+                q = q * abs(x - y) % n
+                
+            g, _ = euclides_div(q, n)
+            k += RHO_BATCH
+            
+        r *= 2
         
-    return is_prim      
+    # The factor is in the last batch, step by step from its start.
+    if g == n:
+        g = 1
+        while g == 1:
+            ys = (ys * ys + c) % n
+            g, _ = euclides_div(abs(x - ys), n)
+            
+    return g
+
+def _factorize(n, small_primes, small_primes_product):
+    """Prime factors of n > 1 in increasing order."""
+    
+    factors = []
+    
+    # Trial division only by the small primes that divide n.
+    small_gcd, _ = euclides_div(n, small_primes_product)
+    
+    if small_gcd > 1:
+        for p in small_primes:
+            if small_gcd % p == 0:
+                while n % p == 0:
+                    n //= p
+                    factors.append(p)
+                    
+    # Without small factors, the composite numbers aren't lower than the 
+    # square of SMALL_PRIMES_LIMIT.
+    pending = [ n ] if n > 1 else []
+    
+    while pending:
+        m = pending.pop()
+        
+        if m < SMALL_PRIMES_LIMIT * SMALL_PRIMES_LIMIT or \
+            _is_prime_after_prefilter(m):
+            factors.append(m)
+        else:
+            c = 1
+            d = _pollard_brent(m, c)
+            
+            while d == m:
+                c += 1
+                d = _pollard_brent(m, c)
+                
+            pending.extend([ d, m // d ])
+            
+    factors.sort()
+    
+    return factors
+
+def _cached_factorize(n, small_primes, small_primes_product):
+    
+    factors = _factor_cache.pop(n, None)
+    
+    if factors is None:
+        factors = tuple(_factorize(n, small_primes, small_primes_product))
+        
+        if len(_factor_cache) >= FACTOR_CACHE_SIZE:
+            _factor_cache.popitem(last=False)
+            
+    # The most recently used at the end.
+    _factor_cache[n] = factors
+    
+    return list(factors)
+
+def factorize(n):
+    """Reference: https://en.wikipedia.org/wiki/Integer_factorization
+    
+    Prime factors of n in increasing order, repeated as many times as they 
+    divide n. Trial division by the small primes, then Pollard-Brent rho for
+    the composite factors left, using is_prime to stop splitting them.
+    """
+    
+    if n < 1:
+        raise ValueError("Only positive integers can be factorized: %d" % n)
+    
+    small_primes, _, small_primes_product = _small_primes()
+    
+    return _cached_factorize(n, small_primes, small_primes_product)
+
+def factorize_many(iterable):
+    """factorize for every number of iterable, returned as a list. The small 
+    primes are retrieved once for all the batch.
+    """
+    
+    small_primes, _, small_primes_product = _small_primes()
+    
+    results = []
+    
+    for n in iterable:
+        if n < 1:
+            raise ValueError("Only positive integers can be factorized: %d" 
+                             % n)
+        
+        results.append(_cached_factorize(n, small_primes, 
+                                         small_primes_product))
+        
+    return results
+
+def factors(n1, n2):
+    
+    if n1 > 0 and n2 > 0:
+        print "- FACTORS"
+        
+        for n in (n1, n2):
+            start = int(round(time.time() * 1000.0))
+            n_factors = factorize(n)
+            end = int(round(time.time() * 1000.0))
+            print "Factors of %d are %s in %g s" % \
+                (n, ' * '.join(str(p) for p in n_factors), 
+                 (end - start) / 1000.0)
+    else:
+        print "For factors arguments must be integer numbers greater than 0."
 
 def sieve_of_Eratosthenes(n):
     """Reference:https://en.wikipedia.org/wiki/Sieve_of_Eratosthenes 
@@ -143,6 +719,322 @@ def sieve_of_Eratosthenes(n):
     
     return [i for i in range(2, n+1) if primes[i]], it  
 
+def _odd_primes_until(n):
+    """Odd primes up to n with an odd only sieve, the base primes of the 
+    segmented sieve.
+    """
+    
+    if n < 3:
+        return []
+    
+    # Position i is the odd number 2 * i + 1.
+    size = (n - 1) // 2 + 1
+    sieve = bytearray(b'\x01') * size
+    sieve[0] = 0
+    
+    for i in xrange(1, (_isqrt(n) - 1) // 2 + 1):
+        if sieve[i]:
+            p = 2 * i + 1
+            start = p * p // 2
+            sieve[start::p] = bytearray((size - 1 - start) // p + 1)
+            
+    return list(compress(xrange(1, 2 * size, 2), sieve))
+
+def _sieve_segment(low, size, base_primes):
+    """Sieve the odd numbers low, low + 2, ..., low + 2 * (size - 1), low 
+    must be odd. Returns a bytearray with 1 for the primes.
+    """
+    
+    high = low + 2 * (size - 1)
+    segment = bytearray(b'\x01') * size
+    
+    for p in base_primes:
+        p2 = p * p
+        if p2 > high:
+            break
+        
+        # First odd multiple of p in the segment, not lower than p * p.
+        start = max(p2, (low + p - 1) // p * p)
+        if not start & 1:
+            start += p
+            
+        if start <= high:
+            idx = (start - low) // 2
+            segment[idx::p] = bytearray((size - 1 - idx) // p + 1)
+            
+    # 1 isn't prime.
+    if low == 1:
+        segment[0] = 0
+            
+    return segment
+
+def _segments(n, segment_size):
+    """Yield the segments of odd numbers up to n, forever with n None, as 
+    tuples of their first number and their sieve. With n the base primes up
+    to sqrt(n) are computed once, as in parallel_segments.
+    """
+    
+    base_limit = 0
+    base_primes = []
+    
+    if n is not None:
+        base_limit = _isqrt(n)
+        base_primes = _odd_primes_until(base_limit)
+        
+    low = 1
+    
+    while n is None or low <= n:
+        size = segment_size
+        if n is not None:
+            size = min(size, (n - low) // 2 + 1)
+            
+        high = low + 2 * (size - 1)
+        
+        # Extend the base primes without end, doubling their limit to do it
+        # rarely.
+        root = _isqrt(high)
+        if root > base_limit:
+            base_limit = max(root, 2 * base_limit)
+            base_primes = _odd_primes_until(base_limit)
+            
+        yield low, _sieve_segment(low, size, base_primes)
+        
+        low = high + 2
+
+def segmented_sieve(n=None, segment_size=SEGMENT_SIZE):
+    """Reference: https://en.wikipedia.org/wiki/Sieve_of_Eratosthenes#Segmented_sieve
+    
+    Generator of the primes up to n, or without end if n is None. Only odd 
+    numbers are stored, one byte each in a bytearray of segment_size bytes,
+    and the composites are removed with slice assignments, so the memory 
+    used doesn't depend on n.
+    """
+    
+    if n is not None and n < 2:
+        return
+    
+    yield 2
+    
+    for low, segment in _segments(n, segment_size):
+        for p in compress(xrange(low, low + 2 * len(segment), 2), segment):
+            yield p
+        
+def count_primes(n, segment_size=SEGMENT_SIZE):
+    """Number of primes up to n using the segmented sieve without listing 
+    them.
+    """
+    
+    if n < 2:
+        return 0
+    
+    return 1 + sum(segment.count(b'\x01') 
+                   for _, segment in _segments(n, segment_size))
+
+def prime_pi(n):
+    """Reference: https://en.wikipedia.org/wiki/Prime-counting_function#Algorithms_for_evaluating_%CF%80(x)
+    
+    Number of primes up to n with the Lucy_Hedgehog algorithm in 
+    O(n^(3/4)) time and O(n^(1/2)) memory. S(v) is the count of the numbers
+    from 2 to v that aren't multiples of the primes sieved so far, it is 
+    only needed for the values n // i, and sieving the prime p changes it to
+    S(v) - (S(v // p) - S(p - 1)). The primes up to sqrt(n) are taken from 
+    the sieve.
+    """
+    
+    if n < 2:
+        return 0
+    
+    r = _isqrt(n)
+    
+    # S(v) for v <= r, and S(n // i) for i <= r.
+    small = [ v - 1 for v in xrange(r + 1) ]
+    large = [ 0 ] + [ n // i - 1 for i in xrange(1, r + 1) ]
+    
+    for p in [ 2 ] + _odd_primes_until(r):
+        sp = small[p - 1]
+        p2 = p * p
+        
+        limit = min(r, n // p2)
+        large_limit = min(limit, r // p)
+        
+        # The values n // (i * p) are large ones while i * p <= r.
+        large[1:large_limit + 1] = [ 
+            s + sp - t for s, t in zip(large[1:large_limit + 1], 
+                                       large[p:p * large_limit + 1:p]) ]
+        
+        large[large_limit + 1:limit + 1] = [ 
+            large[i] + sp - small[n // (i * p)] 
+            for i in xrange(large_limit + 1, limit + 1) ]
+        
+        # The comprehensions read the values before sieving p.
+        small[p2:] = [ small[v] + sp - small[v // p] 
+                       for v in xrange(p2, r + 1) ]
+                
+    return large[1]
+
+def _pack_bits(segment):
+    """Pack a bytearray of 0 and 1 in bits, the first byte in the lowest bit.
+    """
+    
+    nbytes = (len(segment) + 7) // 8
+    
+    if not nbytes:
+        return b''
+    
+    value = int(str(segment).translate(_BYTES_TO_BITS)[::-1] or '0', 2)
+    
+    return binascii.unhexlify('%0*x' % (2 * nbytes, value))[::-1]
+
+def _unpack_bits(packed, nbits):
+    """Inverse of _pack_bits."""
+    
+    value = int(binascii.hexlify(packed[::-1]) or '0', 16)
+    
+    return bytearray(bin(value)[2:].zfill(nbits)[::-1][:nbits]
+                     .translate(_BITS_TO_BYTES))
+
+class SegmentResult(object):
+    """Primes of a segment of the parallel sieve."""
+    
+    def __init__(self, low, high, count, elapsed, primes=None):
+        
+        self.low = low
+        self.high = high
+        self.count = count
+        self.elapsed = elapsed
+        self.primes = primes
+
+# Small primes as a list, a set and their product, set by _small_primes.
+_small_primes_cache = []
+
+# Factorizations of factorize, the least recently used ones are discarded.
+_factor_cache = OrderedDict()
+
+# Base primes and shared slots of the workers of the parallel sieve, set by
+# _init_sieve_worker.
+_sieve_worker_data = {}
+
+def _init_sieve_worker(base_primes, slots):
+    
+    _sieve_worker_data["base_primes"] = base_primes
+    _sieve_worker_data["slots"] = slots
+
+def _sieve_worker(args):
+    """Sieve a segment in a worker. Returns its count and time, and when the
+    primes are needed writes its packed bits in its shared slot.
+    """
+    
+    low, size, slot_offset, count_only = args
+    
+    start = time.time()
+    
+    segment = _sieve_segment(low, size, _sieve_worker_data["base_primes"])
+    count = segment.count(b'\x01')
+    
+    if not count_only:
+        packed = _pack_bits(segment)
+        
+        ctypes.memmove(ctypes.addressof(_sieve_worker_data["slots"]) + 
+                       slot_offset, packed, len(packed))
+        
+    return count, time.time() - start
+
+def parallel_segments(n, num_workers=None, count_only=True, 
+                      segment_size=PARALLEL_SEGMENT_SIZE):
+    """Reference: https://en.wikipedia.org/wiki/Sieve_of_Eratosthenes#Segmented_sieve
+    
+    Segmented sieve up to n in a pool of processes. The base primes up to 
+    sqrt(n) are computed once and every worker sieves disjoint segments of 
+    odd numbers. Yields a SegmentResult for every segment in order, with its
+    primes unless count_only. The workers write the bits of the primes in 
+    slots of shared memory, SLOTS_PER_WORKER for every worker, and a slot is
+    reused by a new segment once its primes have been read, so the memory 
+    doesn't grow with n.
+    """
+    
+    if n < 3:
+        return
+    
+    if segment_size % 8:
+        raise ValueError("segment_size must be a multiple of 8")
+    
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    
+    base_primes = _odd_primes_until(_isqrt(n))
+    
+    num_odds = (n - 1) // 2 + 1
+    
+    num_slots = SLOTS_PER_WORKER * num_workers
+    slot_bytes = segment_size // 8
+    
+    slots = None
+    if not count_only:
+        slots = RawArray(ctypes.c_ubyte, num_slots * slot_bytes)
+        
+    tasks = ( (2 * i + 1, min(segment_size, num_odds - i), 
+               (i // segment_size % num_slots) * slot_bytes, count_only)
+              for i in xrange(0, num_odds, segment_size) )
+    
+    pool = multiprocessing.Pool(num_workers, _init_sieve_worker, 
+                                (base_primes, slots))
+    
+    try:
+        # The segments in flight, one for every slot at most.
+        pending = deque()
+        
+        for task in islice(tasks, num_slots):
+            pending.append((task, pool.apply_async(_sieve_worker, (task,))))
+            
+        while pending:
+            (low, size, slot_offset, _), result = pending.popleft()
+            count, elapsed = result.get()
+            
+            seg_primes = None
+            
+            if not count_only:
+                packed = ctypes.string_at(ctypes.addressof(slots) + 
+                                          slot_offset, (size + 7) // 8)
+                
+                segment = _unpack_bits(packed, size)
+                seg_primes = list(compress(xrange(low, low + 2 * size, 2), 
+                                           segment))
+                
+            # The slot of the segment is free for the next one.
+            for task in islice(tasks, 1):
+                pending.append((task, pool.apply_async(_sieve_worker, 
+                                                       (task,))))
+                
+            yield SegmentResult(low, low + 2 * (size - 1), count, elapsed, 
+                                seg_primes)
+    finally:
+        pool.terminate()
+        
+def parallel_count_primes(n, num_workers=None, 
+                          segment_size=PARALLEL_SEGMENT_SIZE):
+    """Number of primes up to n with the parallel sieve, and the results of 
+    every segment with their times.
+    """
+    
+    if n < 2:
+        return 0, []
+    
+    segments = list(parallel_segments(n, num_workers, True, segment_size))
+    
+    return 1 + sum(seg.count for seg in segments), segments
+
+def parallel_sieve(n, num_workers=None, segment_size=PARALLEL_SEGMENT_SIZE):
+    """Generator of the primes up to n with the parallel sieve."""
+    
+    if n < 2:
+        return
+    
+    yield 2
+    
+    for seg in parallel_segments(n, num_workers, False, segment_size):
+        for p in seg.primes:
+            yield p
+
 def other_sieve_for_primes(n):
     
     it = 0
@@ -166,7 +1058,7 @@ def other_sieve_for_primes(n):
     
     return [i for i in range(2, n+1) if primes[i]], it  
         
-def primes(n):
+def primes(n, num_workers=1):
     
     print "- PRIMES"
     
@@ -182,6 +1074,38 @@ def primes(n):
     print "Other sieve, list of primes until %d has %d in %g s (using %d iterations)" \
         % (n, len(primes), (end - start) / 1000.0, it)        
         
+    start = int(round(time.time() * 1000.0))
+    num_primes = sum(1 for _ in segmented_sieve(n))
+    end = int(round(time.time() * 1000.0))
+    print "Segmented sieve, primes until %d are %d in %g s" \
+        % (n, num_primes, (end - start) / 1000.0)
+        
+    start = int(round(time.time() * 1000.0))
+    num_primes = count_primes(n)
+    end = int(round(time.time() * 1000.0))
+    print "Segmented sieve, count of primes until %d is %d in %g s" \
+        % (n, num_primes, (end - start) / 1000.0)
+    
+    start = int(round(time.time() * 1000.0))
+    num_primes = prime_pi(n)
+    end = int(round(time.time() * 1000.0))
+    print "Lucy_Hedgehog, count of primes until %d is %d in %g s" \
+        % (n, num_primes, (end - start) / 1000.0)
+    
+    if num_workers > 1:
+        start = int(round(time.time() * 1000.0))
+        num_primes, segments = parallel_count_primes(n, num_workers)
+        end = int(round(time.time() * 1000.0))
+        print "Parallel sieve with %d workers, count of primes until %d is %d in %g s" \
+            % (num_workers, n, num_primes, (end - start) / 1000.0)
+            
+        if segments:
+            times = [ seg.elapsed for seg in segments ]
+            slowest = max(segments, key=lambda seg: seg.elapsed)
+            print "%d segments, time per segment min %g s, mean %g s, max %g s (%d to %d)" \
+                % (len(segments), min(times), sum(times) / len(times), 
+                   slowest.elapsed, slowest.low, slowest.high)
+        
     primes = [2]
     [ primes.append(i) for i in range(3,1000) if all(i % n != 0 for n in primes)]
     print "Primes generation using a list comprehension: %s" % primes
@@ -189,15 +1113,19 @@ def primes(n):
 if __name__ == "__main__":
     
     if len(sys.argv) < NUM_ARGS:
-        print"ERROR: Use: %s number1 number2 ..." % sys.argv[0]
+        print"ERROR: Use: %s number1 number2 [primes_limit] [workers]" % sys.argv[0]
     else:
         n1 = int(sys.argv[1])
         n2 = int(sys.argv[2])
         
         gcd_mcm(n1, n2)
         
+        factors(n1, n2)
+        
+        num_workers = int(sys.argv[4]) if len(sys.argv) > NUM_ARGS + 1 else 1
+        
         if len(sys.argv) > NUM_ARGS:
-            primes(int(sys.argv[3]))
+            primes(int(sys.argv[3]), num_workers)
         else:
             primes(n1)
             
\ No newline at end of file
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Felipe Gallego. All rights reserved.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Parallel sort using a pool of processes, every process sorts a chunk of
+the list with one of the algorithms of sorting.py and the sorted chunks are
+merged with a parallel tree of sorting.merge.
+"""
+
+import ctypes
+import multiprocessing
+import random
+import sys
+import time
+
+from multiprocessing.sharedctypes import RawArray
+
+import sorting
+
+# Lists shorter than this are sorted in the calling process, for them the
+# cost of starting the pool is greater than the gain.
+PARALLEL_CUTOFF = 20000
+
+DEFAULT_ALGO = "timsort"
+
+BENCHMARK_ELTS = 1000000
+BENCHMARK_WORKERS = [ 1, 2, 4, 8 ]
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+# Shared buffers of the pool, set in every worker by _init_worker.
+_buffers = []
+
+def _init_worker(buffers):
+
+    _buffers[:] = buffers
+
+def _fits_in_int64(the_list):
+
+    return all(isinstance(x, (int, long)) and INT64_MIN <= x <= INT64_MAX
+               for x in the_list)
+
+def _sort_shared_chunk(args):
+    """Sort in place the items lo:hi of the first shared buffer."""
+
+    algo, lo, hi = args
+
+    buf = _buffers[0]
+
+    chunk, nops = sorting.SORTING_ALGOS[algo](buf[lo:hi])
+
+    buf[lo:hi] = chunk
+
+    return nops
+
+def _merge_shared_chunks(args):
+    """Merge the sorted items lo:mid and mid:hi of the shared buffer src into
+    the shared buffer dst.
+    """
+
+    src, lo, mid, hi = args
+
+    src_buf = _buffers[src]
+    dst_buf = _buffers[1 - src]
+
+    result, nops = sorting.merge(src_buf[lo:mid], src_buf[mid:hi])
+
+    dst_buf[lo:hi] = result
+
+    return nops
+
+def _sort_list_chunk(args):
+
+    algo, chunk = args
+
+    return sorting.SORTING_ALGOS[algo](chunk)
+
+def _merge_list_chunks(args):
+
+    return sorting.merge(*args)
+
+def _chunk_limits(n, num_chunks):
+
+    return [ (i * n) / num_chunks for i in range(num_chunks + 1) ]
+
+def _parallel_sort_shared(the_list, num_workers, algo):
+    """Sort a list of 64 bits integers copying it to shared memory, so the
+    workers only receive the limits of their chunks.
+    """
+
+    n = len(the_list)
+
+    buffers = [ RawArray(ctypes.c_longlong, n),
+                RawArray(ctypes.c_longlong, n) ]
+    buffers[0][:] = the_list
+
+    pool = multiprocessing.Pool(num_workers, _init_worker, (buffers,))
+
+    try:
+        limits = _chunk_limits(n, num_workers)
+
+        nops = sum(pool.map(_sort_shared_chunk,
+                            [ (algo, limits[i], limits[i + 1])
+                              for i in range(num_workers) ]))
+
+        # Merge tree, each level merges pairs of adjacent chunks from one
+        # buffer to the other.
+        src = 0
+        while len(limits) > 2:
+            tasks = [ (src, limits[i], limits[i + 1], limits[i + 2])
+                      for i in range(0, len(limits) - 2, 2) ]
+
+            nops += sum(pool.map(_merge_shared_chunks, tasks))
+
+            # An odd chunk at the end is copied as is.
+            if len(limits) % 2 == 0:
+                lo = limits[-2]
+                buffers[1 - src][lo:n] = buffers[src][lo:n]
+
+            limits = limits[::2] + ([ n ] if len(limits) % 2 == 0 else [])
+            src = 1 - src
+    finally:
+        pool.terminate()
+
+    the_list[:] = buffers[src][:]
+
+    return the_list, nops
+
+def _parallel_sort_pickled(the_list, num_workers, algo):
+    """Sort any list sending the chunks to the workers pickled."""
+
+    limits = _chunk_limits(len(the_list), num_workers)
+
+    pool = multiprocessing.Pool(num_workers)
+
+    try:
+        results = pool.map(_sort_list_chunk,
+                           [ (algo, the_list[limits[i]:limits[i + 1]])
+                             for i in range(num_workers) ])
+
+        chunks = [ r[0] for r in results ]
+        nops = sum(r[1] for r in results)
+
+        while len(chunks) > 1:
+            results = pool.map(_merge_list_chunks,
+                               [ (chunks[i], chunks[i + 1])
+                                 for i in range(0, len(chunks) - 1, 2) ])
+
+            nops += sum(r[1] for r in results)
+
+            odd_chunk = [ chunks[-1] ] if len(chunks) % 2 else []
+            chunks = [ r[0] for r in results ] + odd_chunk
+    finally:
+        pool.terminate()
+
+    the_list[:] = chunks[0]
+
+    return the_list, nops
+
+def parallel_sort(the_list, num_workers=None, algo=DEFAULT_ALGO,
+                  cutoff=PARALLEL_CUTOFF):
+    """Sort the list splitting it in num_workers chunks, every chunk is sorted
+    in a process of a pool with the algorithm algo of sorting.SORTING_ALGOS
+    and the sorted chunks are merged by the pool in a tree of merges.
+
+    Lists of 64 bits integers are moved between processes in shared memory,
+    any other list is pickled. Lists shorter than cutoff, or a single worker,
+    are sorted in the calling process. Returns the sorted list and the
+    operations of all the processes.
+    """
+
+    if algo not in sorting.SORTING_ALGOS:
+        raise ValueError("Unknown sorting algorithm: %s" % algo)
+
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+
+    if len(the_list) < max(cutoff, 2 * num_workers) or num_workers <= 1:
+        return sorting.SORTING_ALGOS[algo](the_list)
+
+    if _fits_in_int64(the_list):
+        return _parallel_sort_shared(the_list, num_workers, algo)
+    else:
+        return _parallel_sort_pickled(the_list, num_workers, algo)
+
+def main():
+
+    random.seed(sorting.THE_SEED)
+
+    the_list = [ random.randint(0, 10 * BENCHMARK_ELTS)
+                 for _ in xrange(BENCHMARK_ELTS) ]
+
+    print "- Sorting %d items with merge sort in one process ..." % \
+        len(the_list)
+
+    start = time.time()
+    list_sorted, nops = sorting.merge_sort(list(the_list))
+    base_time = time.time() - start
+
+    print "%d operations. Time elapsed: %g s." % (nops, base_time)
+
+    for num_workers in BENCHMARK_WORKERS:
+        print "- Parallel sort with %d workers ..." % num_workers
+
+        start = time.time()
+        list_sorted, nops = parallel_sort(list(the_list), num_workers, "merge")
+        elapsed = time.time() - start
+
+        print "%d operations. Time elapsed: %g s. Speedup: %.2f" % \
+            (nops, elapsed, base_time / elapsed)
+
+        sorting.test_sort(list_sorted)
+
+    return 0
+
+if __name__ == "__main__":
+
+    sys.exit(main())
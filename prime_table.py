@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Felipe Gallego. All rights reserved.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Table of primes stored in a file, built once with the segmented sieve of
+numbers.py and memory mapped read only, so it can be shared by many processes
+and used without reading it whole.
+
+The file stores a bit for every number coprime with 30, one byte for every
+30 numbers (wheel factorization, see
+https://en.wikipedia.org/wiki/Wheel_factorization), and the number of primes
+before every block of BLOCK_BYTES bytes to count primes without reading the
+bits before the block.
+"""
+
+import binascii
+import mmap
+import struct
+import sys
+import time
+
+import numbers
+
+NUM_ARGS = 3
+
+MAGIC = "PRIMETB1"
+
+# Magic, limit, bytes per block, number of bytes of bits, number of blocks.
+HEADER_FORMAT = "<8sQIQQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+INDEX_FORMAT = "<Q"
+INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+
+BLOCK_BYTES = 4096
+BLOCKS_PER_SEGMENT = 64
+
+WHEEL = 30
+WHEEL_RESIDUES = [ 1, 7, 11, 13, 17, 19, 23, 29 ]
+WHEEL_BIT = dict((r, b) for b, r in enumerate(WHEEL_RESIDUES))
+WHEEL_PRIMES = [ 2, 3, 5 ]
+
+# Translations of the bytes 0 / 1 of a sieve to the bit of every residue.
+_BIT_TABLES = [ ''.join(chr(i) for i in range(256)).replace('\x01',
+                                                            chr(1 << bit))
+                for bit in range(8) ]
+
+# Offsets in the wheel of the bits set in every byte.
+_BYTE_OFFSETS = [ [ WHEEL_RESIDUES[b] for b in range(8) if i >> b & 1 ]
+                  for i in range(256) ]
+
+def _popcount(data):
+    """Bits set in a string of bytes."""
+
+    if not data:
+        return 0
+
+    return bin(int(binascii.hexlify(data), 16)).count('1')
+
+def _wheel_bytes(low_byte, num_bytes, base_primes):
+    """Bits of the numbers coprime with 30 from 30 * low_byte, num_bytes
+    bytes.
+    """
+
+    low = WHEEL * low_byte + 1
+
+    # The odd numbers of the range, 15 in every byte of the wheel.
+    segment = numbers._sieve_segment(low, 15 * num_bytes, base_primes)
+
+    value = 0
+
+    for bit, r in enumerate(WHEEL_RESIDUES):
+        column = str(segment[(r - 1) // 2::15]).translate(_BIT_TABLES[bit])
+
+        value |= int(binascii.hexlify(column), 16)
+
+    return binascii.unhexlify('%0*x' % (2 * num_bytes, value))
+
+def build_prime_table(file_name, limit):
+    """Write the table of primes up to limit to file_name, sieving a segment
+    of BLOCKS_PER_SEGMENT blocks at a time.
+    """
+
+    num_bytes = limit // WHEEL + 1
+    num_blocks = (num_bytes + BLOCK_BYTES - 1) // BLOCK_BYTES
+
+    base_primes = numbers._odd_primes_until(numbers._isqrt(WHEEL * num_bytes))
+
+    index = []
+    count = 0
+
+    with open(file_name, 'wb') as f:
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, limit, BLOCK_BYTES,
+                            num_bytes, num_blocks))
+
+        segment_bytes = BLOCK_BYTES * BLOCKS_PER_SEGMENT
+
+        for low_byte in xrange(0, num_bytes, segment_bytes):
+            size = min(segment_bytes, num_bytes - low_byte)
+            data = _wheel_bytes(low_byte, size, base_primes)
+
+            # Remove the numbers greater than limit of the last byte.
+            if low_byte + size == num_bytes:
+                last = ord(data[-1])
+                for bit, r in enumerate(WHEEL_RESIDUES):
+                    if WHEEL * (num_bytes - 1) + r > limit:
+                        last &= ~(1 << bit)
+                data = data[:-1] + chr(last)
+
+            for i in xrange(0, size, BLOCK_BYTES):
+                index.append(count)
+                count += _popcount(data[i:i + BLOCK_BYTES])
+
+            f.write(data)
+
+        f.write(struct.pack("<%dQ" % len(index), *index))
+
+class PrimeTable(object):
+    """Read only view of a table of primes built with build_prime_table."""
+
+    def __init__(self, file_name):
+
+        self._file = open(file_name, 'rb')
+
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+        except:
+            self._file.close()
+            raise
+
+        magic, self.limit, self._block_bytes, self._num_bytes, \
+            self._num_blocks = struct.unpack_from(HEADER_FORMAT, self._mm)
+
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("%s isn't a table of primes" % file_name)
+
+        self._index_offset = HEADER_SIZE + self._num_bytes
+
+    def close(self):
+
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+    def _byte(self, idx):
+
+        return ord(self._mm[HEADER_SIZE + idx])
+
+    def _check_limit(self, n):
+
+        if n > self.limit:
+            raise ValueError("%d is greater than the limit of the table, %d"
+                             % (n, self.limit))
+
+    def is_prime(self, n):
+        """Primality of n, numbers.is_prime for numbers beyond the table."""
+
+        if n > self.limit:
+            return numbers.is_prime(n)
+
+        if n in WHEEL_PRIMES:
+            return True
+
+        bit = WHEEL_BIT.get(n % WHEEL)
+
+        if bit is None or n < 2:
+            return False
+
+        return bool(self._byte(n // WHEEL) >> bit & 1)
+
+    def primes_in_range(self, lo, hi):
+        """Generator of the primes p with lo <= p <= hi."""
+
+        self._check_limit(hi)
+
+        for p in WHEEL_PRIMES:
+            if lo <= p <= hi:
+                yield p
+
+        first = max(lo, 0) // WHEEL
+
+        for idx in xrange(first, hi // WHEEL + 1):
+            base = WHEEL * idx
+
+            for r in _BYTE_OFFSETS[self._byte(idx)]:
+                if lo <= base + r <= hi:
+                    yield base + r
+
+    def next_prime(self, n):
+        """Smallest prime greater than n."""
+
+        for p in WHEEL_PRIMES:
+            if p > n:
+                return p
+
+        idx = (n + 1) // WHEEL
+
+        while idx < self._num_bytes:
+            base = WHEEL * idx
+
+            for r in _BYTE_OFFSETS[self._byte(idx)]:
+                if base + r > n:
+                    return base + r
+
+            idx += 1
+
+        # Beyond the table.
+        p = max(n + 1, self.limit + 1)
+        while not numbers.is_prime(p):
+            p += 1
+
+        return p
+
+    def prime_pi(self, n):
+        """Number of primes lower or equal than n, the count before its block
+        from the index plus the bits of the block up to n.
+        """
+
+        if n < 2:
+            return 0
+
+        self._check_limit(n)
+
+        count = sum(1 for p in WHEEL_PRIMES if p <= n)
+
+        idx = n // WHEEL
+        block = idx // self._block_bytes
+        block_start = block * self._block_bytes
+
+        count += struct.unpack_from(INDEX_FORMAT, self._mm,
+                                    self._index_offset + INDEX_SIZE * block)[0]
+
+        count += _popcount(self._mm[HEADER_SIZE + block_start:
+                                    HEADER_SIZE + idx])
+
+        base = WHEEL * idx
+        count += sum(1 for r in _BYTE_OFFSETS[self._byte(idx)]
+                     if base + r <= n)
+
+        return count
+
+def main(args):
+
+    command = args[0]
+    file_name = args[1]
+
+    if command == "build" and len(args) > 2:
+        limit = int(args[2])
+
+        start = time.time()
+        build_prime_table(file_name, limit)
+        end = time.time()
+
+        print "Table of primes until %d built in %s in %g s" % \
+            (limit, file_name, end - start)
+    elif command == "query" and len(args) > 2:
+        n = int(args[2])
+
+        start = time.time()
+
+        with PrimeTable(file_name) as table:
+            print "%d is prime: %s" % (n, table.is_prime(n))
+            print "Next prime after %d: %d" % (n, table.next_prime(n))
+
+            if n <= table.limit:
+                print "Primes until %d: %d" % (n, table.prime_pi(n))
+
+        end = time.time()
+
+        print "Time elapsed: %g s" % (end - start)
+    else:
+        print "ERROR: Use: %s build|query file_name number" % sys.argv[0]
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+
+    if len(sys.argv) < NUM_ARGS + 1:
+        print "ERROR: Use: %s build|query file_name number" % sys.argv[0]
+    else:
+        sys.exit(main(sys.argv[1:]))
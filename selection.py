@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Felipe Gallego. All rights reserved.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Selection algorithms, the k-th item, the k lowest items or the first k
+items in order without sorting the whole list. They report operations as the
+sorting algorithms do.
+"""
+
+import heapq
+import time
+
+import sorting
+
+TOP_K = 100
+
+class _HeapItem(object):
+    """Item of a heap that counts its comparisons, the order is reversed to
+    keep the greatest item at the top of a heapq heap.
+    """
+
+    __slots__ = ("item", "reverse", "counter")
+
+    def __init__(self, item, reverse, counter):
+
+        self.item = item
+        self.reverse = reverse
+        self.counter = counter
+
+    def __lt__(self, other):
+
+        self.counter[0] += 1
+
+        if self.reverse:
+            return other.item < self.item
+        else:
+            return self.item < other.item
+
+def nth_element(the_list, n):
+    """Reference: https://en.wikipedia.org/wiki/Introselect
+
+    Reorder the list in place so the item at n is the one that would be there
+    if the list were sorted, with no greater items before it and no lower
+    items after it. Quickselect with the pivots and the three way partition
+    of intro_sort, it sorts the range with heapsort when the partitions don't
+    shrink fast enough.
+    """
+
+    nops = 0
+    lo = 0
+    hi = len(the_list)
+
+    if not 0 <= n < hi:
+        raise IndexError("nth_element index out of range")
+
+    depth_limit = 2 * (hi.bit_length() - 1)
+
+    while hi - lo > sorting.INTRO_INSERTION_CUTOFF:
+        # Too many bad pivots, heapsort bounds the worst case.
+        if not depth_limit:
+            return the_list, nops + sorting._heap_sort(the_list, lo, hi)
+
+        depth_limit -= 1
+
+        pivot_idx, p_nops = sorting._choose_pivot(the_list, lo, hi)
+        lt, gt, q_nops = sorting._partition_three_way(the_list, lo, hi,
+                                                      the_list[pivot_idx])
+        nops += p_nops + q_nops
+
+        # Keep only the partition with n.
+        if n < lt:
+            hi = lt
+        elif n >= gt:
+            lo = gt
+        else:
+            return the_list, nops
+
+    if hi - lo > 1:
+        nops += sorting._binary_insertion_sort(the_list, lo, hi, lo + 1)
+
+    return the_list, nops
+
+def partial_sort(the_list, k):
+    """Reorder the list in place so its first k items are the k lowest ones
+    in order, the order of the rest of the items is undefined.
+    """
+
+    k = min(k, len(the_list))
+
+    if k <= 0:
+        return the_list, 0
+
+    # Select the k lowest items and sort only them.
+    the_list, nops = nth_element(the_list, k - 1)
+
+    if k > 1:
+        depth_limit = 2 * (k.bit_length() - 1)
+
+        nops += sorting._intro_sort(the_list, 0, k - 1, depth_limit)
+
+    return the_list, nops
+
+def top_k(iterable, k, largest=False):
+    """Reference: https://en.wikipedia.org/wiki/Partial_sorting#Heap-based_solution
+
+    The k lowest items of iterable in order, or the k greatest from the
+    greatest with largest. It reads the items one at a time keeping only a
+    heap with the best k, so the iterable can be longer than the memory.
+    """
+
+    counter = [ 0 ]
+    heap = []
+
+    if k <= 0:
+        return [], 0
+
+    for item in iterable:
+        if len(heap) < k:
+            heapq.heappush(heap, _HeapItem(item, not largest, counter))
+        else:
+            # Only the items better than the worst of the heap go in.
+            counter[0] += 1
+
+            if (heap[0].item < item) if largest else (item < heap[0].item):
+                heapq.heapreplace(heap, _HeapItem(item, not largest, counter))
+
+    result, nops = sorting.tim_sort([ h.item for h in heap ], reverse=largest)
+
+    return result, nops + counter[0]
+
+def perform_selection(name, fun, *args):
+
+    print "- Trying %s ..." % name
+
+    start = time.time()
+
+    result, nops = fun(*args)
+
+    end = time.time()
+
+    print "%d operations. Time elapsed: %s s." % (nops, end - start)
+
+    return result
+
+def main():
+
+    the_list = sorting.generate_random_list()
+    middle = len(the_list) / 2
+
+    print "Median and %d lowest of %d items:" % (TOP_K, len(the_list))
+
+    list_sorted = perform_selection("intro sort", sorting.intro_sort,
+                                    list(the_list))
+
+    median = perform_selection("nth_element", nth_element, list(the_list),
+                               middle)[middle]
+
+    print "... the median is %s" % \
+        ("ok" if median == list_sorted[middle] else "NOT ok")
+
+    lowest = perform_selection("top_k", top_k, iter(the_list), TOP_K)
+
+    print "... the %d lowest are %s" % \
+        (TOP_K, "ok" if lowest == list_sorted[:TOP_K] else "NOT ok")
+
+    lowest = perform_selection("partial_sort", partial_sort, list(the_list),
+                               TOP_K)[:TOP_K]
+
+    print "... the %d lowest are %s" % \
+        (TOP_K, "ok" if lowest == list_sorted[:TOP_K] else "NOT ok")
+
+if __name__ == "__main__":
+
+    main()
@@ -17,11 +17,25 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 """Script with algorithms with sequences as random numbers generation, finding
-cycles in sequences and looking for substrings.
+cycles in sequences and looking for substrings, and exact computation of 
+integer sequences as Fibonacci numbers and factorials.
 """
 
+from collections import OrderedDict
+
 SEED = 3771
 
+# Values of fibonacci and factorial kept for repeated queries.
+FIB_CACHE_SIZE = 256
+FACTORIAL_CACHE_SIZE = 64
+
+# Ranges multiplied one by one at the leaves of the product tree.
+PRODUCT_LEAF_SIZE = 16
+
+# Largest n of fibonacci and factorial in main.
+FIB_MAX_N = 90
+FACTORIAL_MAX_N = 25
+
 #M_BBS = (71 * 73)
 #M_BBS = (311 * 313) 
 M_BBS = (523 * 541)
@@ -98,6 +112,133 @@ def brent(fun, x0):
  
     return lam, mu
 
+# Values of fibonacci and factorial, the least recently used ones are 
+# discarded.
+_fib_cache = OrderedDict()
+_factorial_cache = OrderedDict()
+
+def _cached(cache, max_size, fun, n):
+    """fun(n) from the cache, computed and kept in it if it isn't there."""
+    
+    value = cache.pop(n, None)
+    
+    if value is None:
+        value = fun(n)
+        
+        if len(cache) >= max_size:
+            cache.popitem(last=False)
+            
+    # The most recently used at the end.
+    cache[n] = value
+    
+    return value
+
+def _fib_pair(n):
+    """F(n) and F(n + 1) with fast doubling, from the bits of n, the most
+    significant first:
+    F(2k) = F(k) * (2 * F(k + 1) - F(k))
+    F(2k + 1) = F(k)^2 + F(k + 1)^2
+    """
+    
+    a, b = 0, 1
+    
+    for bit in bin(n)[2:]:
+        a, b = a * (2 * b - a), a * a + b * b
+        
+        if bit == '1':
+            a, b = b, a + b
+            
+    return a, b
+
+def _fibonacci(n):
+    
+    return _fib_pair(n)[0]
+
+def fibonacci(n, cached=True):
+    """Reference: https://www.nayuki.io/page/fast-fibonacci-algorithms
+    
+    The n-th Fibonacci number, F(0) = 0 and F(1) = 1, with O(log n) 
+    multiplications. The last FIB_CACHE_SIZE values are kept when cached.
+    """
+    
+    if n < 0:
+        raise ValueError("n can't be negative: %d" % n)
+    
+    if cached:
+        return _cached(_fib_cache, FIB_CACHE_SIZE, _fibonacci, n)
+    
+    return _fibonacci(n)
+
+def _product(lo, hi):
+    """Product of the integers from lo to hi - 1 splitting the range in two 
+    halves, so the factors of every multiplication have similar sizes.
+    """
+    
+    if hi - lo <= PRODUCT_LEAF_SIZE:
+        result = 1
+        for i in xrange(lo, hi):
+            result *= i
+        return result
+    
+    mid = (lo + hi) // 2
+    
+    return _product(lo, mid) * _product(mid, hi)
+
+def _factorial(n):
+    
+    return _product(2, n + 1)
+
+def factorial(n, cached=True):
+    """Reference: https://en.wikipedia.org/wiki/Factorial#Computation
+    
+    n! with binary splitting, a product tree of the numbers up to n. The 
+    last FACTORIAL_CACHE_SIZE values are kept when cached.
+    """
+    
+    if n < 0:
+        raise ValueError("n can't be negative: %d" % n)
+    
+    if cached:
+        return _cached(_factorial_cache, FACTORIAL_CACHE_SIZE, _factorial, n)
+    
+    return _factorial(n)
+
+def fib_range(a, b):
+    """Generator of the Fibonacci numbers from F(a) to F(b - 1), only F(a) and
+    F(a + 1) are computed, the rest are additions of the previous two.
+    """
+    
+    if a < 0:
+        raise ValueError("a can't be negative: %d" % a)
+    
+    if a >= b:
+        return
+    
+    prev, cur = _fib_pair(a)
+    
+    for _ in xrange(a, b):
+        yield prev
+        prev, cur = cur, prev + cur
+        
+def factorial_range(a, b):
+    """Generator of the factorials from a! to (b - 1)!, every one is the 
+    previous one by a multiplication.
+    """
+    
+    if a < 0:
+        raise ValueError("a can't be negative: %d" % a)
+    
+    if a >= b:
+        return
+    
+    value = factorial(a)
+    
+    yield value
+    
+    for i in xrange(a + 1, b):
+        value *= i
+        yield value
+
 def main():
     
     print "Generating random numbers with Blum, Blum, Shum."
@@ -106,6 +247,12 @@ def main():
 
     print "Brent -> Shortest cycle: %d, position of the first cycle: %d" % \
             brent(blum_blum_shum, SEED)   
+            
+    print "Fibonacci numbers until F(%d): %s" % \
+            (FIB_MAX_N, list(fib_range(0, FIB_MAX_N + 1)))
+            
+    print "Factorials until %d!: %s" % \
+            (FACTORIAL_MAX_N, list(factorial_range(0, FACTORIAL_MAX_N + 1)))
 
 if __name__ == "__main__":
     
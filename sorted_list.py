@@ -0,0 +1,397 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Felipe Gallego. All rights reserved.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""A list that keeps its items sorted when they are inserted or deleted, so
+it isn't needed to sort it again after every change.
+"""
+
+import bisect
+import itertools
+import random
+import time
+
+import sorting
+
+BLOCK_SIZE = 1000
+
+# A batch of updates is merged with the items instead of inserted one by one
+# when it has more items than the list divided by this factor.
+BULK_UPDATE_FACTOR = 16
+
+NUM_BATCHES = 100
+BATCH_SIZE = 10
+
+class SortedList(object):
+    """Sorted list stored as a list of sorted blocks of at most twice
+    block_size items, with the greatest item of every block to find the block
+    of an item by bisection and a Fenwick tree with the lengths of the blocks
+    to find an item by its position.
+
+    Reference: https://en.wikipedia.org/wiki/Fenwick_tree
+    """
+
+    def __init__(self, iterable=None, block_size=BLOCK_SIZE):
+
+        self._block_size = block_size
+        self._blocks = []
+        self._maxes = []
+        self._tree = [ 0 ]
+        self._len = 0
+
+        if iterable is not None:
+            self.update(iterable)
+
+    @classmethod
+    def from_sorted(cls, sequence, block_size=BLOCK_SIZE):
+        """Build the list from a sequence already sorted, without sorting it
+        again.
+        """
+
+        sorted_list = cls(block_size=block_size)
+
+        sorted_list._load(list(sequence))
+
+        return sorted_list
+
+    def _load(self, values):
+
+        bs = self._block_size
+
+        self._blocks = [ values[i:i + bs] for i in xrange(0, len(values), bs) ]
+        self._maxes = [ block[-1] for block in self._blocks ]
+        self._len = len(values)
+
+        self._build_index()
+
+    def _build_index(self):
+
+        m = len(self._blocks)
+        tree = [ 0 ] + [ len(block) for block in self._blocks ]
+
+        for i in xrange(1, m + 1):
+            j = i + (i & -i)
+            if j <= m:
+                tree[j] += tree[i]
+
+        self._tree = tree
+
+    def _index_add(self, block_idx, delta):
+
+        i = block_idx + 1
+        m = len(self._blocks)
+
+        while i <= m:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _items_before(self, block_idx):
+        """Number of items in the blocks before block_idx."""
+
+        total = 0
+        i = block_idx
+
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+
+        return total
+
+    def _locate(self, pos):
+        """Block and offset in it of the item at position pos."""
+
+        block_idx = 0
+        bit = 1 << (len(self._blocks).bit_length() - 1) if self._blocks else 0
+
+        while bit:
+            nxt = block_idx + bit
+
+            if nxt < len(self._tree) and self._tree[nxt] <= pos:
+                pos -= self._tree[nxt]
+                block_idx = nxt
+
+            bit >>= 1
+
+        return block_idx, pos
+
+    def _split(self, block_idx):
+        """Split a block that has grown too much."""
+
+        block = self._blocks[block_idx]
+        half = self._block_size
+
+        self._blocks[block_idx:block_idx + 1] = [ block[:half], block[half:] ]
+        self._maxes[block_idx:block_idx + 1] = [ block[half - 1], block[-1] ]
+
+        self._build_index()
+
+    def _delete(self, block_idx, offset):
+
+        block = self._blocks[block_idx]
+
+        del block[offset]
+        self._len -= 1
+
+        if not block:
+            del self._blocks[block_idx]
+            del self._maxes[block_idx]
+            self._build_index()
+        else:
+            self._maxes[block_idx] = block[-1]
+            self._index_add(block_idx, -1)
+
+            # Join the blocks too small with the next one.
+            if len(block) < self._block_size / 2 and \
+                block_idx + 1 < len(self._blocks):
+                block.extend(self._blocks[block_idx + 1])
+                self._maxes[block_idx] = block[-1]
+
+                del self._blocks[block_idx + 1]
+                del self._maxes[block_idx + 1]
+
+                if len(block) > 2 * self._block_size:
+                    self._split(block_idx)
+                else:
+                    self._build_index()
+
+    def add(self, value):
+        """Insert value after the items equal to it."""
+
+        if not self._blocks:
+            self._blocks.append([ value ])
+            self._maxes.append(value)
+            self._len = 1
+            self._build_index()
+            return
+
+        block_idx = bisect.bisect_right(self._maxes, value)
+
+        if block_idx == len(self._blocks):
+            block_idx -= 1
+            self._blocks[block_idx].append(value)
+            self._maxes[block_idx] = value
+        else:
+            bisect.insort_right(self._blocks[block_idx], value)
+
+        self._len += 1
+        self._index_add(block_idx, 1)
+
+        if len(self._blocks[block_idx]) > 2 * self._block_size:
+            self._split(block_idx)
+
+    def update(self, iterable):
+        """Insert all the items of iterable. Big batches are sorted and
+        merged with the items of the list with sorting.merge.
+        """
+
+        values = list(iterable)
+
+        if len(values) * BULK_UPDATE_FACTOR > self._len:
+            values, _ = sorting.tim_sort(values)
+            merged, _ = sorting.merge(list(self), values)
+
+            self._load(merged)
+        else:
+            for value in values:
+                self.add(value)
+
+    def remove(self, value):
+        """Remove the first item equal to value, ValueError if there isn't
+        any.
+        """
+
+        block_idx = bisect.bisect_left(self._maxes, value)
+
+        if block_idx < len(self._blocks):
+            block = self._blocks[block_idx]
+            offset = bisect.bisect_left(block, value)
+
+            if block[offset] == value:
+                self._delete(block_idx, offset)
+                return
+
+        raise ValueError("%r not in SortedList" % (value,))
+
+    def discard(self, value):
+
+        try:
+            self.remove(value)
+        except ValueError:
+            pass
+
+    def pop(self, idx=-1):
+
+        pos = self._position(idx)
+        block_idx, offset = self._locate(pos)
+        value = self._blocks[block_idx][offset]
+
+        self._delete(block_idx, offset)
+
+        return value
+
+    def _position(self, idx):
+
+        pos = idx + self._len if idx < 0 else idx
+
+        if not 0 <= pos < self._len:
+            raise IndexError("SortedList index out of range")
+
+        return pos
+
+    def __getitem__(self, idx):
+
+        block_idx, offset = self._locate(self._position(idx))
+
+        return self._blocks[block_idx][offset]
+
+    def bisect_left(self, value):
+        """Number of items lower than value, its rank."""
+
+        block_idx = bisect.bisect_left(self._maxes, value)
+
+        if block_idx == len(self._blocks):
+            return self._len
+
+        return self._items_before(block_idx) + \
+            bisect.bisect_left(self._blocks[block_idx], value)
+
+    def bisect_right(self, value):
+        """Number of items lower or equal than value."""
+
+        block_idx = bisect.bisect_right(self._maxes, value)
+
+        if block_idx == len(self._blocks):
+            return self._len
+
+        return self._items_before(block_idx) + \
+            bisect.bisect_right(self._blocks[block_idx], value)
+
+    def index(self, value):
+
+        pos = self.bisect_left(value)
+
+        if pos == self._len or self[pos] != value:
+            raise ValueError("%r not in SortedList" % (value,))
+
+        return pos
+
+    def count(self, value):
+
+        return self.bisect_right(value) - self.bisect_left(value)
+
+    def islice(self, start, stop):
+        """Iterate over the items with positions from start to stop."""
+
+        start = max(start, 0)
+        stop = min(stop, self._len)
+
+        if start >= stop:
+            return
+
+        block_idx, offset = self._locate(start)
+        remaining = stop - start
+
+        while remaining:
+            block = self._blocks[block_idx]
+            end = min(len(block), offset + remaining)
+
+            for i in xrange(offset, end):
+                yield block[i]
+
+            remaining -= end - offset
+            block_idx += 1
+            offset = 0
+
+    def irange(self, minimum=None, maximum=None, inclusive=(True, True)):
+        """Iterate over the items between minimum and maximum, None is no
+        limit.
+        """
+
+        if minimum is None:
+            start = 0
+        elif inclusive[0]:
+            start = self.bisect_left(minimum)
+        else:
+            start = self.bisect_right(minimum)
+
+        if maximum is None:
+            stop = self._len
+        elif inclusive[1]:
+            stop = self.bisect_right(maximum)
+        else:
+            stop = self.bisect_left(maximum)
+
+        return self.islice(start, stop)
+
+    def __contains__(self, value):
+
+        pos = self.bisect_left(value)
+
+        return pos < self._len and self[pos] == value
+
+    def __len__(self):
+
+        return self._len
+
+    def __iter__(self):
+
+        return itertools.chain.from_iterable(self._blocks)
+
+    def __repr__(self):
+
+        return "SortedList(%r)" % list(self)
+
+def main():
+
+    random.seed(sorting.THE_SEED)
+
+    the_list = sorting.generate_random_list()
+    batches = [ [ random.randint(0, sorting.MULT) for _ in range(BATCH_SIZE) ]
+                for _ in range(NUM_BATCHES) ]
+
+    print "- Inserting %d batches of %d items sorting again with timsort ..." \
+        % (NUM_BATCHES, BATCH_SIZE)
+
+    list_sorted = sorted(the_list)
+
+    start = time.time()
+    for batch in batches:
+        list_sorted.extend(batch)
+        list_sorted, _ = sorting.tim_sort(list_sorted)
+    end = time.time()
+
+    print "Time elapsed: %s s." % (end - start)
+
+    print "- Inserting %d batches of %d items in a SortedList ..." % \
+        (NUM_BATCHES, BATCH_SIZE)
+
+    sorted_list = SortedList.from_sorted(sorted(the_list))
+
+    start = time.time()
+    for batch in batches:
+        sorted_list.update(batch)
+    end = time.time()
+
+    print "Time elapsed: %s s." % (end - start)
+
+    sorting.test_sort(list(sorted_list))
+
+    print "... same items than timsort: %s" % (list(sorted_list) == list_sorted)
+
+if __name__ == "__main__":
+
+    main()
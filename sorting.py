@@ -17,14 +17,47 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 """Script with several sorting algorithms.
+
+All the algorithms accept key= and reverse= as sorted() does. The key of 
+every item is computed once and the items are sorted decorated with their 
+key and position, so with key or reverse all the algorithms are stable. 
+Without them insertion, bubble, merge, timsort, radix and counting sort are 
+stable and selection, quick and intro sort aren't.
 """
 
+import heapq
 import random
 import time
 
+from array import array
+
+try:
+    import numpy
+except (ImportError, AttributeError):
+    # NumPy isn't installed, or it can't be imported from this directory 
+    # because numbers.py hides the standard module numbers.
+    numpy = None
+
 THE_SEED = 1
 NUM_ELTS = 5000
 MULT = ( 10 * NUM_ELTS )
+NUM_RUNS = 10
+
+# Timsort parameters.
+MIN_MERGE = 32
+MIN_GALLOP = 7
+
+# Introsort parameters.
+INTRO_INSERTION_CUTOFF = 16
+NINTHER_THRESHOLD = 40
+
+# Radix and counting sort parameters, items are stored in arrays of C longs,
+# 64 bits integers in Linux.
+INT_TYPECODE = 'l'
+INT_TYPECODES = 'bBhHiIlL'
+MIN_RADIX_BITS = 8
+MAX_RADIX_BITS = 16
+COUNTING_RANGE_FACTOR = 4
 
 def test_sort(the_list):
     
@@ -40,10 +73,72 @@ def test_sort(the_list):
     else:
         print "... the sorting is NOT ok."
         
-def selection_sort(the_list):
+def _store_sorted(the_list, sorted_buffer):
+    """Copy the sorted items to the list, arrays need an array of their own
+    type.
+    """
+    
+    if sorted_buffer is not the_list:
+        if isinstance(the_list, array) and not isinstance(sorted_buffer, array):
+            sorted_buffer = array(the_list.typecode, sorted_buffer)
+            
+        the_list[:] = sorted_buffer
+    
+    return the_list
+
+def _item_keys(the_list, key):
+    """Keys of the items, computed once for each one."""
+    
+    if key is not None:
+        return [ key(x) for x in the_list ]
+    elif hasattr(the_list, "tolist"):
+        return the_list.tolist()
+    else:
+        return the_list
+
+def _decorate(keys, reverse):
+    """Pairs of keys and positions of their items. With reverse the positions
+    are negated, so sorting ascending and reversing the result keeps equal 
+    items in their original order.
+    """
+    
+    if reverse:
+        return [ (keys[i], -i) for i in xrange(len(keys)) ]
+    else:
+        return [ (keys[i], i) for i in xrange(len(keys)) ]
+    
+def _undecorate(the_list, decorated, reverse):
+    
+    if reverse:
+        decorated.reverse()
+        
+    items = [ the_list[abs(i)] for _, i in decorated ]
+    
+    return _store_sorted(the_list, items)
+
+def _sort_by_key(sort_fun, the_list, key, reverse, keys=None):
+    """Reference: https://en.wikipedia.org/wiki/Schwartzian_transform
+    
+    Sort the list with sort_fun by the key of its items using a 
+    decorate-sort-undecorate, so the sort is stable.
+    """
+    
+    if keys is None:
+        keys = _item_keys(the_list, key)
+    
+    decorated, nops = sort_fun(_decorate(keys, reverse))
+    
+    return _undecorate(the_list, decorated, reverse), nops
+
+def selection_sort(the_list, key=None, reverse=False):
     """Reference: https://en.wikipedia.org/wiki/Selection_sort
+    
+    Not stable.
     """
     
+    if key is not None or reverse:
+        return _sort_by_key(selection_sort, the_list, key, reverse)
+    
     nops = 0    
     
     # Walk the list to set in each iteration the minimum item of the
@@ -68,10 +163,15 @@ def selection_sort(the_list):
     
     return the_list, nops   
 
-def insertion_sort(the_list):
+def insertion_sort(the_list, key=None, reverse=False):
     """Reference: https://en.wikipedia.org/wiki/Insertion_sort
+    
+    Stable.
     """
     
+    if key is not None or reverse:
+        return _sort_by_key(insertion_sort, the_list, key, reverse)
+    
     nops = 0    
     
     # Walk the list from the second item to the end.
@@ -89,10 +189,15 @@ def insertion_sort(the_list):
     
     return the_list, nops
 
-def bubble_sort(the_list):
+def bubble_sort(the_list, key=None, reverse=False):
     """Reference: https://en.wikipedia.org/wiki/Bubble_sort
+    
+    Stable.
     """
     
+    if key is not None or reverse:
+        return _sort_by_key(bubble_sort, the_list, key, reverse)
+    
     nops = 0    
     
     max_pos = len(the_list) - 1
@@ -106,10 +211,15 @@ def bubble_sort(the_list):
                 
     return the_list, nops       
 
-def quick_sort(the_list):
+def quick_sort(the_list, key=None, reverse=False):
     """Reference: https://en.wikipedia.org/wiki/Quicksort
+    
+    Not stable.
     """
     
+    if key is not None or reverse:
+        return _sort_by_key(quick_sort, the_list, key, reverse)
+    
     nops = 0    
     
     if len(the_list) <= 1:
@@ -134,6 +244,172 @@ def quick_sort(the_list):
     
     return (qless + pivot + qmore), (nops + lnops + mnops) 
 
+def _median_of_three(the_list, i, j, k):
+    """Index of the median of the items at positions i, j and k."""
+    
+    a, b, c = the_list[i], the_list[j], the_list[k]
+    
+    if a < b:
+        if b < c:
+            return j, 2
+        elif a < c:
+            return k, 3
+        else:
+            return i, 3
+    elif a < c:
+        return i, 2
+    elif b < c:
+        return k, 3
+    else:
+        return j, 3
+
+def _choose_pivot(the_list, lo, hi):
+    """Index of a pivot for the_list[lo:hi], the median of three for short
+    ranges and Tukey's ninther for the long ones.
+    """
+    
+    last = hi - 1
+    mid = lo + ((hi - lo) >> 1)
+    
+    if hi - lo < NINTHER_THRESHOLD:
+        return _median_of_three(the_list, lo, mid, last)
+    
+    step = (hi - lo) >> 3
+    
+    m1, n1 = _median_of_three(the_list, lo, lo + step, lo + 2 * step)
+    m2, n2 = _median_of_three(the_list, mid - step, mid, mid + step)
+    m3, n3 = _median_of_three(the_list, last - 2 * step, last - step, last)
+    
+    pivot_idx, n4 = _median_of_three(the_list, m1, m2, m3)
+    
+    return pivot_idx, n1 + n2 + n3 + n4
+
+def _partition_three_way(the_list, lo, hi, pivot):
+    """Reference: https://en.wikipedia.org/wiki/Dutch_national_flag_problem
+    
+    Partition the_list[lo:hi] in place into items lower, equal and greater
+    than the pivot. Returns the limits of the items equal to the pivot.
+    """
+    
+    nops = 0
+    
+    lt = i = lo
+    gt = hi - 1
+    
+    while i <= gt:
+        if the_list[i] < pivot:
+            the_list[lt], the_list[i] = the_list[i], the_list[lt]
+            lt += 1
+            i += 1
+            nops += 1
+        elif pivot < the_list[i]:
+            the_list[i], the_list[gt] = the_list[gt], the_list[i]
+            gt -= 1
+            nops += 2
+        else:
+            i += 1
+            nops += 2
+            
+    return lt, gt + 1, nops
+
+def _sift_down(the_list, lo, root, end):
+    """Move down the item at root of the heap stored in the_list[lo:lo+end].
+    """
+    
+    nops = 0
+    
+    while True:
+        child = 2 * root + 1
+        
+        if child >= end:
+            break
+        
+        if child + 1 < end:
+            if the_list[lo + child] < the_list[lo + child + 1]:
+                child += 1
+            nops += 1
+            
+        nops += 1
+        
+        if the_list[lo + root] < the_list[lo + child]:
+            the_list[lo + root], the_list[lo + child] = \
+                the_list[lo + child], the_list[lo + root]
+            root = child
+        else:
+            break
+        
+    return nops
+
+def _heap_sort(the_list, lo, hi):
+    """Reference: https://en.wikipedia.org/wiki/Heapsort
+    
+    Sort the_list[lo:hi] in place.
+    """
+    
+    nops = 0
+    n = hi - lo
+    
+    # Build a max heap.
+    for root in range((n - 2) / 2, -1, -1):
+        nops += _sift_down(the_list, lo, root, n)
+        
+    # Move the maximum to the end and restore the heap with the rest.
+    for end in range(n - 1, 0, -1):
+        the_list[lo], the_list[lo + end] = the_list[lo + end], the_list[lo]
+        nops += _sift_down(the_list, lo, 0, end)
+        
+    return nops
+
+def _intro_sort(the_list, lo, hi, depth_limit):
+    
+    nops = 0
+    
+    while hi - lo > INTRO_INSERTION_CUTOFF:
+        # Too many bad pivots, heapsort bounds the worst case.
+        if not depth_limit:
+            return nops + _heap_sort(the_list, lo, hi)
+        
+        depth_limit -= 1
+        
+        pivot_idx, p_nops = _choose_pivot(the_list, lo, hi)
+        lt, gt, q_nops = _partition_three_way(the_list, lo, hi, 
+                                              the_list[pivot_idx])
+        nops += p_nops + q_nops
+        
+        # Recurse into the shortest partition and iterate over the longest,
+        # so the stack depth is at most log2(n).
+        if lt - lo < hi - gt:
+            nops += _intro_sort(the_list, lo, lt, depth_limit)
+            lo = gt
+        else:
+            nops += _intro_sort(the_list, gt, hi, depth_limit)
+            hi = lt
+            
+    if hi - lo > 1:
+        nops += _binary_insertion_sort(the_list, lo, hi, lo + 1)
+            
+    return nops
+
+def intro_sort(the_list, key=None, reverse=False):
+    """Reference: https://en.wikipedia.org/wiki/Introsort
+    
+    In place quicksort with median of three or ninther pivots, three way 
+    partitioning, insertion sort for short partitions and heapsort when the
+    recursion depth passes 2 * log2(n). Not stable.
+    """
+    
+    if key is not None or reverse:
+        return _sort_by_key(intro_sort, the_list, key, reverse)
+    
+    n = len(the_list)
+    
+    if n <= 1:
+        return the_list, 0
+    
+    depth_limit = 2 * (n.bit_length() - 1)
+    
+    return the_list, _intro_sort(the_list, 0, n, depth_limit)
+
 def merge(left, right): 
     
     nops = 0
@@ -160,10 +436,44 @@ def merge(left, right):
     
     return result, nops
 
-def merge_sort(the_list):
+def k_way_merge(runs):
+    """Reference: https://en.wikipedia.org/wiki/K-way_merge_algorithm
+    
+    Generalisation of merge to any number of sorted iterables, yields the 
+    items in order using a heap with the next item of each run. Equal items 
+    are yielded in the order of their runs, so the merge is stable.
+    """
+    
+    heap = []
+    
+    for i, run in enumerate(runs):
+        it = iter(run)
+        for item in it:
+            heap.append((item, i, it))
+            break
+        
+    heapq.heapify(heap)
+    
+    while heap:
+        item, i, it = heap[0]
+        
+        yield item
+        
+        for next_item in it:
+            heapq.heapreplace(heap, (next_item, i, it))
+            break
+        else:
+            heapq.heappop(heap)
+
+def merge_sort(the_list, key=None, reverse=False):
     """Reference: https://en.wikipedia.org/wiki/Merge_sort
+    
+    Stable.
     """
     
+    if key is not None or reverse:
+        return _sort_by_key(merge_sort, the_list, key, reverse)
+    
     if len(the_list) <= 1:
         return the_list, 0
     
@@ -176,11 +486,759 @@ def merge_sort(the_list):
     
     return mresult, mnops + lnops + rnops
 
-def tim_sort(the_list):
+def _merge_into(src, dst, lo, mid, hi):
+    """Merge src[lo:mid] and src[mid:hi] into dst[lo:hi] without creating 
+    any list.
+    """
+    
+    nops = 0
+    
+    l_idx = lo
+    r_idx = mid
+    k = lo
+    
+    while l_idx < mid and r_idx < hi:
+        if src[l_idx] <= src[r_idx]:
+            dst[k] = src[l_idx]
+            l_idx += 1
+        else:
+            dst[k] = src[r_idx]
+            r_idx += 1
+            
+        k += 1
+        nops += 1
+        
+    # Copy the rest of the run not exhausted.
+    while l_idx < mid:
+        dst[k] = src[l_idx]
+        l_idx += 1
+        k += 1
+        
+    while r_idx < hi:
+        dst[k] = src[r_idx]
+        r_idx += 1
+        k += 1
+        
+    return nops
+
+def merge_sort_bottom_up(the_list, key=None, reverse=False):
+    """Reference: https://en.wikipedia.org/wiki/Merge_sort#Bottom-up_implementation
+    
+    Iterative merge sort, merges runs of width 1, 2, 4, ... alternating 
+    between the list and a single auxiliary buffer, so there is no recursion
+    and no slices. Stable.
+    """
+    
+    if key is not None or reverse:
+        return _sort_by_key(merge_sort_bottom_up, the_list, key, reverse)
+    
+    nops = 0
+    n = len(the_list)
+    
+    if n <= 1:
+        return the_list, nops
+    
+    src = the_list
+    dst = [None] * n
+    
+    width = 1
+    while width < n:
+        for lo in xrange(0, n, 2 * width):
+            mid = min(lo + width, n)
+            hi = min(lo + 2 * width, n)
+            
+            nops += _merge_into(src, dst, lo, mid, hi)
+            
+        src, dst = dst, src
+        width *= 2
+        
+    # The last pass could have left the result in the auxiliary buffer.
+    if src is not the_list:
+        for k in xrange(n):
+            the_list[k] = src[k]
+    
+    return the_list, nops
+
+def _min_run_length(n):
+    """Minimum length of a run, computed as in CPython's listsort so the 
+    number of runs is a power of two or slightly less.
+    """
+    
+    r = 0
+    
+    while n >= MIN_MERGE:
+        r |= n & 1
+        n >>= 1
+        
+    return n + r
+
+def _count_run(the_list, lo, hi):
+    """Length of the run that begins at lo, reversing it in place when it is 
+    strictly descending so every run returned is ascending.
+    """
+    
+    nops = 0
+    run_hi = lo + 1
+    
+    if run_hi == hi:
+        return 1, nops
+    
+    nops += 1
+    
+    if the_list[run_hi] < the_list[lo]:
+        run_hi += 1
+        while run_hi < hi and the_list[run_hi] < the_list[run_hi - 1]:
+            run_hi += 1
+            nops += 1
+            
+        # Strictly descending, so reversing it keeps the sort stable.
+        the_list[lo:run_hi] = the_list[lo:run_hi][::-1]
+    else:
+        run_hi += 1
+        while run_hi < hi and not the_list[run_hi] < the_list[run_hi - 1]:
+            run_hi += 1
+            nops += 1
+            
+    return run_hi - lo, nops
+
+def _binary_insertion_sort(the_list, lo, hi, start):
+    """Sort the_list[lo:hi] knowing that the_list[lo:start] is already 
+    sorted.
+    """
+    
+    nops = 0
+    
+    for i in range(start, hi):
+        pivot = the_list[i]
+        
+        left = lo
+        right = i
+        
+        # Rightmost position for the pivot among the sorted items.
+        while left < right:
+            mid = (left + right) >> 1
+            
+            if pivot < the_list[mid]:
+                right = mid
+            else:
+                left = mid + 1
+                
+            nops += 1
+        
+        the_list[left + 1:i + 1] = the_list[left:i]
+        the_list[left] = pivot
+        
+    return nops
+
+def _gallop_left(key, the_list, base, length, hint):
+    """Leftmost position in the_list[base:base+length] where key could be 
+    inserted, searching with exponential steps from hint.
+    """
+    
+    nops = 1
+    last_ofs = 0
+    ofs = 1
+    
+    if the_list[base + hint] < key:
+        # Gallop right until the_list[base+hint+last_ofs] < key <= 
+        # the_list[base+hint+ofs].
+        max_ofs = length - hint
+        while ofs < max_ofs and the_list[base + hint + ofs] < key:
+            last_ofs = ofs
+            ofs = (ofs << 1) + 1
+            nops += 1
+            
+        ofs = min(ofs, max_ofs)
+        last_ofs += hint
+        ofs += hint
+    else:
+        # Gallop left until the_list[base+hint-ofs] < key <= 
+        # the_list[base+hint-last_ofs].
+        max_ofs = hint + 1
+        while ofs < max_ofs and not the_list[base + hint - ofs] < key:
+            last_ofs = ofs
+            ofs = (ofs << 1) + 1
+            nops += 1
+            
+        ofs = min(ofs, max_ofs)
+        last_ofs, ofs = hint - ofs, hint - last_ofs
+    
+    # Binary search in the range found.
+    last_ofs += 1
+    while last_ofs < ofs:
+        mid = last_ofs + ((ofs - last_ofs) >> 1)
+        
+        if the_list[base + mid] < key:
+            last_ofs = mid + 1
+        else:
+            ofs = mid
+            
+        nops += 1
+        
+    return ofs, nops
+
+def _gallop_right(key, the_list, base, length, hint):
+    """Rightmost position in the_list[base:base+length] where key could be 
+    inserted, searching with exponential steps from hint.
+    """
+    
+    nops = 1
+    last_ofs = 0
+    ofs = 1
+    
+    if key < the_list[base + hint]:
+        # Gallop left until the_list[base+hint-ofs] <= key < 
+        # the_list[base+hint-last_ofs].
+        max_ofs = hint + 1
+        while ofs < max_ofs and key < the_list[base + hint - ofs]:
+            last_ofs = ofs
+            ofs = (ofs << 1) + 1
+            nops += 1
+            
+        ofs = min(ofs, max_ofs)
+        last_ofs, ofs = hint - ofs, hint - last_ofs
+    else:
+        # Gallop right until the_list[base+hint+last_ofs] <= key < 
+        # the_list[base+hint+ofs].
+        max_ofs = length - hint
+        while ofs < max_ofs and not key < the_list[base + hint + ofs]:
+            last_ofs = ofs
+            ofs = (ofs << 1) + 1
+            nops += 1
+            
+        ofs = min(ofs, max_ofs)
+        last_ofs += hint
+        ofs += hint
+    
+    # Binary search in the range found.
+    last_ofs += 1
+    while last_ofs < ofs:
+        mid = last_ofs + ((ofs - last_ofs) >> 1)
+        
+        if key < the_list[base + mid]:
+            ofs = mid
+        else:
+            last_ofs = mid + 1
+            
+        nops += 1
+        
+    return ofs, nops
+
+def _merge_lo(the_list, base1, len1, base2, len2, min_gallop):
+    """Merge two adjacent runs when the first one is the shortest, copying it 
+    to a temporary list and filling the_list from the left.
+    
+    The first item of the second run must be less than the first item of the 
+    first run, and the last item of the first run must be greater than all 
+    the items of the second run.
+    """
+    
+    nops = 0
+    tmp = the_list[base1:base1 + len1]
+    cursor1 = 0
+    cursor2 = base2
+    dest = base1
+    
+    # The first item of the second run is the lowest of both.
+    the_list[dest] = the_list[cursor2]
+    dest += 1
+    cursor2 += 1
+    len2 -= 1
+    
+    count1 = count2 = 0
+    
+    while len1 > 1 and len2 > 0:
+        if count1 < min_gallop and count2 < min_gallop:
+            # One item at a time while no run wins consistently.
+            nops += 1
+            
+            if the_list[cursor2] < tmp[cursor1]:
+                the_list[dest] = the_list[cursor2]
+                cursor2 += 1
+                len2 -= 1
+                count2 += 1
+                count1 = 0
+            else:
+                the_list[dest] = tmp[cursor1]
+                cursor1 += 1
+                len1 -= 1
+                count1 += 1
+                count2 = 0
+                
+            dest += 1
+        else:
+            # Galloping, copy in one step all the items of a run that are 
+            # before the next item of the other run.
+            count1, g_nops = _gallop_right(the_list[cursor2], tmp, cursor1, 
+                                           len1, 0)
+            nops += g_nops
+            if count1:
+                the_list[dest:dest + count1] = tmp[cursor1:cursor1 + count1]
+                dest += count1
+                cursor1 += count1
+                len1 -= count1
+                if len1 <= 1:
+                    break
+                
+            the_list[dest] = the_list[cursor2]
+            dest += 1
+            cursor2 += 1
+            len2 -= 1
+            if not len2:
+                break
+            
+            count2, g_nops = _gallop_left(tmp[cursor1], the_list, cursor2, 
+                                          len2, 0)
+            nops += g_nops
+            if count2:
+                the_list[dest:dest + count2] = \
+                    the_list[cursor2:cursor2 + count2]
+                dest += count2
+                cursor2 += count2
+                len2 -= count2
+                if not len2:
+                    break
+                
+            the_list[dest] = tmp[cursor1]
+            dest += 1
+            cursor1 += 1
+            len1 -= 1
+            
+            # Make galloping easier to reenter while it pays off, and leave it
+            # when it doesn't.
+            if count1 < MIN_GALLOP and count2 < MIN_GALLOP:
+                min_gallop += 1
+                count1 = count2 = 0
+            else:
+                min_gallop = max(1, min_gallop - 1)
+                
+    if len2:
+        # Only the greatest item of the first run remains.
+        the_list[dest:dest + len2] = the_list[cursor2:cursor2 + len2]
+        the_list[dest + len2] = tmp[cursor1]
+    else:
+        the_list[dest:dest + len1] = tmp[cursor1:cursor1 + len1]
+        
+    return min_gallop, nops
+
+def _merge_hi(the_list, base1, len1, base2, len2, min_gallop):
+    """Merge two adjacent runs when the second one is the shortest, copying 
+    it to a temporary list and filling the_list from the right.
+    
+    Same preconditions than _merge_lo.
+    """
+    
+    nops = 0
+    tmp = the_list[base2:base2 + len2]
+    cursor1 = base1 + len1 - 1
+    cursor2 = len2 - 1
+    dest = base2 + len2 - 1
+    
+    # The last item of the first run is the greatest of both.
+    the_list[dest] = the_list[cursor1]
+    dest -= 1
+    cursor1 -= 1
+    len1 -= 1
+    
+    count1 = count2 = 0
+    
+    while len2 > 1 and len1 > 0:
+        if count1 < min_gallop and count2 < min_gallop:
+            # One item at a time while no run wins consistently.
+            nops += 1
+            
+            if tmp[cursor2] < the_list[cursor1]:
+                the_list[dest] = the_list[cursor1]
+                cursor1 -= 1
+                len1 -= 1
+                count1 += 1
+                count2 = 0
+            else:
+                the_list[dest] = tmp[cursor2]
+                cursor2 -= 1
+                len2 -= 1
+                count2 += 1
+                count1 = 0
+                
+            dest -= 1
+        else:
+            # Galloping, copy in one step all the items of a run that are 
+            # after the next item of the other run.
+            pos, g_nops = _gallop_right(tmp[cursor2], the_list, base1, len1, 
+                                        len1 - 1)
+            nops += g_nops
+            count1 = len1 - pos
+            if count1:
+                the_list[dest - count1 + 1:dest + 1] = \
+                    the_list[cursor1 - count1 + 1:cursor1 + 1]
+                dest -= count1
+                cursor1 -= count1
+                len1 -= count1
+                if not len1:
+                    break
+                
+            the_list[dest] = tmp[cursor2]
+            dest -= 1
+            cursor2 -= 1
+            len2 -= 1
+            if len2 == 1:
+                break
+            
+            pos, g_nops = _gallop_left(the_list[cursor1], tmp, 0, len2, 
+                                       len2 - 1)
+            nops += g_nops
+            count2 = len2 - pos
+            if count2:
+                the_list[dest - count2 + 1:dest + 1] = \
+                    tmp[cursor2 - count2 + 1:cursor2 + 1]
+                dest -= count2
+                cursor2 -= count2
+                len2 -= count2
+                if len2 <= 1:
+                    break
+                
+            the_list[dest] = the_list[cursor1]
+            dest -= 1
+            cursor1 -= 1
+            len1 -= 1
+            
+            # Make galloping easier to reenter while it pays off, and leave it
+            # when it doesn't.
+            if count1 < MIN_GALLOP and count2 < MIN_GALLOP:
+                min_gallop += 1
+                count1 = count2 = 0
+            else:
+                min_gallop = max(1, min_gallop - 1)
+                
+    if len1:
+        # Only the lowest item of the second run remains.
+        the_list[dest - len1 + 1:dest + 1] = \
+            the_list[cursor1 - len1 + 1:cursor1 + 1]
+        the_list[dest - len1] = tmp[cursor2]
+    else:
+        the_list[dest - len2 + 1:dest + 1] = tmp[:len2]
+        
+    return min_gallop, nops
+
+def _merge_at(the_list, runs, i, min_gallop):
+    """Merge the runs i and i + 1 of the stack of runs."""
+    
+    base1, len1 = runs[i]
+    base2, len2 = runs[i + 1]
+    
+    runs[i][1] = len1 + len2
+    del runs[i + 1]
+    
+    # Items of the first run lower than the first of the second one are 
+    # already in place.
+    k, nops = _gallop_right(the_list[base2], the_list, base1, len1, 0)
+    base1 += k
+    len1 -= k
+    if not len1:
+        return min_gallop, nops
+    
+    # Items of the second run greater than the last of the first one are 
+    # already in place.
+    len2, g_nops = _gallop_left(the_list[base1 + len1 - 1], the_list, base2, 
+                                len2, len2 - 1)
+    nops += g_nops
+    if not len2:
+        return min_gallop, nops
+    
+    if len1 <= len2:
+        min_gallop, m_nops = _merge_lo(the_list, base1, len1, base2, len2, 
+                                       min_gallop)
+    else:
+        min_gallop, m_nops = _merge_hi(the_list, base1, len1, base2, len2, 
+                                       min_gallop)
+        
+    return min_gallop, nops + m_nops
+
+def _merge_collapse(the_list, runs, min_gallop):
+    """Merge runs of the stack until its lengths satisfy the invariants 
+    len(A) > len(B) + len(C) and len(B) > len(C).
+    """
+    
+    nops = 0
+    
+    while len(runs) > 1:
+        n = len(runs) - 2
+        
+        if (n > 0 and runs[n - 1][1] <= runs[n][1] + runs[n + 1][1]) or \
+            (n > 1 and runs[n - 2][1] <= runs[n - 1][1] + runs[n][1]):
+            if runs[n - 1][1] < runs[n + 1][1]:
+                n -= 1
+        elif runs[n][1] > runs[n + 1][1]:
+            break
+        
+        min_gallop, m_nops = _merge_at(the_list, runs, n, min_gallop)
+        nops += m_nops
+        
+    return min_gallop, nops
+
+def tim_sort(the_list, key=None, reverse=False):
     """Reference: https://en.wikipedia.org/wiki/Timsort
+    
+    Natural merge sort, finds the runs already sorted in the list, extends 
+    the short ones to a minimum length with binary insertion sort and merges 
+    them using galloping when a run wins consistently. Stable.
     """
     
-    return the_list, 0
+    if key is not None or reverse:
+        return _sort_by_key(tim_sort, the_list, key, reverse)
+    
+    # The slices of NumPy arrays are views and the merges need copies, sort 
+    # a list with the items.
+    if numpy is not None and isinstance(the_list, numpy.ndarray):
+        list_sorted, nops = tim_sort(the_list.tolist())
+        
+        return _store_sorted(the_list, list_sorted), nops
+    
+    nops = 0
+    n = len(the_list)
+    
+    if n < 2:
+        return the_list, nops
+    
+    min_run = _min_run_length(n)
+    min_gallop = MIN_GALLOP
+    runs = []
+    
+    lo = 0
+    while lo < n:
+        run_len, r_nops = _count_run(the_list, lo, n)
+        nops += r_nops
+        
+        # Extend the short runs to min_run.
+        if run_len < min_run:
+            force = min(min_run, n - lo)
+            nops += _binary_insertion_sort(the_list, lo, lo + force, 
+                                           lo + run_len)
+            run_len = force
+            
+        runs.append([lo, run_len])
+        
+        min_gallop, m_nops = _merge_collapse(the_list, runs, min_gallop)
+        nops += m_nops
+        
+        lo += run_len
+        
+    # Merge all the remaining runs, the most recent ones first.
+    while len(runs) > 1:
+        n = len(runs) - 2
+        if n > 0 and runs[n - 1][1] < runs[n + 1][1]:
+            n -= 1
+        
+        min_gallop, m_nops = _merge_at(the_list, runs, n, min_gallop)
+        nops += m_nops
+    
+    return the_list, nops
+
+def _is_integer_sequence(the_list):
+    """Check if all the items are integers, looking only at the type of the 
+    buffer for arrays.
+    """
+    
+    if numpy is not None and isinstance(the_list, numpy.ndarray):
+        return the_list.dtype.kind in 'iu'
+    elif isinstance(the_list, array):
+        return the_list.typecode in INT_TYPECODES
+    else:
+        return all(isinstance(x, (int, long)) for x in the_list)
+    
+def _integer_buffer(the_list):
+    """A compact buffer with the items of the list, the list itself if they 
+    don't fit in a 64 bits integer.
+    """
+    
+    if isinstance(the_list, list):
+        try:
+            return array(INT_TYPECODE, the_list)
+        except OverflowError:
+            return the_list
+    else:
+        return the_list
+    
+def _radix_bits(n, key_bits):
+    """Bits of the digits used by radix sort, the largest ones with a number
+    of buckets not much greater than the number of items, and balanced so all
+    the passes use digits of the same size.
+    """
+    
+    max_bits = min(MAX_RADIX_BITS, max(MIN_RADIX_BITS, n.bit_length()))
+    
+    passes = (key_bits + max_bits - 1) / max_bits
+    
+    return (key_bits + passes - 1) / passes
+
+def _counting_sort_numpy(the_list, min_key, key_range):
+    
+    counts = numpy.bincount(the_list.astype(numpy.int64) - min_key, 
+                            minlength=key_range)
+    
+    the_list[:] = numpy.repeat(numpy.arange(min_key, min_key + key_range,
+                                            dtype=the_list.dtype), counts)
+    
+    return the_list, len(the_list) + key_range
+
+def _sort_by_int_key(sort_fun, the_list, key, reverse):
+    """Sort the list by integer keys packing every key and the position of 
+    its item in a single integer, so sort_fun still sorts integers. Keys 
+    that aren't integers are sorted with _sort_by_key.
+    """
+    
+    keys = _item_keys(the_list, key)
+    
+    if not keys or not _is_integer_sequence(keys):
+        return _sort_by_key(sort_fun, the_list, key, reverse, keys)
+    
+    n = len(keys)
+    pos_bits = max(1, (n - 1).bit_length())
+    pos_mask = (1 << pos_bits) - 1
+    
+    # Reverse sorts ascending the distance to the greatest key.
+    if reverse:
+        max_key = max(keys)
+        packed = [ ((max_key - keys[i]) << pos_bits) | i for i in xrange(n) ]
+    else:
+        min_key = min(keys)
+        packed = [ ((keys[i] - min_key) << pos_bits) | i for i in xrange(n) ]
+        
+    packed, nops = sort_fun(packed)
+    
+    items = [ the_list[p & pos_mask] for p in packed ]
+    
+    return _store_sorted(the_list, items), nops
+
+def counting_sort(the_list, key=None, reverse=False):
+    """Reference: https://en.wikipedia.org/wiki/Counting_sort
+    
+    For integers in a range not much greater than the number of items, it 
+    uses radix sort for wider ranges and timsort for items that aren't 
+    integers. Works on lists, arrays and NumPy arrays. Stable.
+    """
+    
+    if key is not None or reverse:
+        return _sort_by_int_key(counting_sort, the_list, key, reverse)
+    
+    n = len(the_list)
+    
+    if n <= 1:
+        return the_list, 0
+    
+    if not _is_integer_sequence(the_list):
+        return tim_sort(the_list)
+    
+    min_key = int(min(the_list))
+    key_range = int(max(the_list)) - min_key + 1
+    
+    if key_range > COUNTING_RANGE_FACTOR * n:
+        return radix_sort(the_list)
+    
+    if numpy is not None and isinstance(the_list, numpy.ndarray):
+        return _counting_sort_numpy(the_list, min_key, key_range)
+    
+    buf = _integer_buffer(the_list)
+    
+    counts = array(INT_TYPECODE, [0]) * key_range
+    
+    for k in buf:
+        counts[k - min_key] += 1
+        
+    # Write every key as many times as it was counted.
+    pos = 0
+    for d in xrange(key_range):
+        c = counts[d]
+        for i in xrange(pos, pos + c):
+            buf[i] = min_key + d
+        pos += c
+            
+    return _store_sorted(the_list, buf), n + key_range
+
+def _radix_sort_numpy(the_list, min_key, key_bits, radix_bits):
+    
+    mask = (1 << radix_bits) - 1
+    digit_type = numpy.uint8 if radix_bits <= 8 else numpy.uint16
+    
+    keys = (the_list.astype(numpy.int64) - min_key).astype(numpy.uint64)
+    
+    nops = 0
+    for shift in range(0, key_bits, radix_bits):
+        digits = ((keys >> numpy.uint64(shift)) & 
+                  numpy.uint64(mask)).astype(digit_type)
+        
+        # Stable sort of small integers, NumPy uses radix sort for them.
+        keys = keys[numpy.argsort(digits, kind='stable')]
+        
+        nops += 2 * len(keys)
+        
+    the_list[:] = (keys.astype(numpy.int64) + min_key).astype(the_list.dtype)
+        
+    return the_list, nops
+
+def radix_sort(the_list, key=None, reverse=False):
+    """Reference: https://en.wikipedia.org/wiki/Radix_sort#Least_significant_digit
+    
+    LSD radix sort of integers, the size of the digits depends on the range of
+    the keys and the number of items. Items that aren't integers are sorted 
+    with timsort. Works on lists, arrays and NumPy arrays. Stable.
+    """
+    
+    if key is not None or reverse:
+        return _sort_by_int_key(radix_sort, the_list, key, reverse)
+    
+    n = len(the_list)
+    
+    if n <= 1:
+        return the_list, 0
+    
+    if not _is_integer_sequence(the_list):
+        return tim_sort(the_list)
+    
+    min_key = int(min(the_list))
+    key_bits = max(1, (int(max(the_list)) - min_key).bit_length())
+    radix_bits = _radix_bits(n, key_bits)
+    
+    if numpy is not None and isinstance(the_list, numpy.ndarray):
+        return _radix_sort_numpy(the_list, min_key, key_bits, radix_bits)
+    
+    mask = (1 << radix_bits) - 1
+    
+    src = _integer_buffer(the_list)
+    dst = src[:]
+    
+    nops = 0
+    for shift in range(0, key_bits, radix_bits):
+        counts = array(INT_TYPECODE, [0]) * (mask + 1)
+        
+        for k in src:
+            counts[((k - min_key) >> shift) & mask] += 1
+            
+        # Position of the first item of every digit.
+        total = 0
+        for d in xrange(mask + 1):
+            counts[d], total = total, total + counts[d]
+            
+        for k in src:
+            d = ((k - min_key) >> shift) & mask
+            dst[counts[d]] = k
+            counts[d] += 1
+            
+        src, dst = dst, src
+        nops += 2 * n
+    
+    return _store_sorted(the_list, src), nops
+
+SORTING_ALGOS = { "selection" : selection_sort,
+                  "insertion" : insertion_sort,
+                  "bubble": bubble_sort,
+                  "quick" : quick_sort,
+                  "intro" : intro_sort,
+                  "merge" : merge_sort,
+                  "merge bottom-up" : merge_sort_bottom_up,
+                  "radix" : radix_sort,
+                  "counting" : counting_sort,
+                  "timsort": tim_sort }
 
 def generate_random_list():
         
@@ -190,11 +1248,23 @@ def generate_random_list():
     
     return the_list
 
-def perform_sort(sort_name, sort_fun):
+def generate_runs_list():
+    """A random list made of NUM_RUNS sorted chunks."""
+    
+    the_list = generate_random_list()
+    
+    run_len = len(the_list) / NUM_RUNS
+    
+    for i in range(0, len(the_list), run_len):
+        the_list[i:i + run_len] = sorted(the_list[i:i + run_len])
+        
+    return the_list
+
+def perform_sort(sort_name, sort_fun, generate_fun=generate_random_list):
     
     print "- Trying %s sort ..." % sort_name
     
-    the_list = generate_random_list()    
+    the_list = generate_fun()    
     
     start = time.time()
     
@@ -208,15 +1278,13 @@ def perform_sort(sort_name, sort_fun):
 
 def main():
     
-    sorting_algos = { "selection" : selection_sort,
-                      "insertion" : insertion_sort,
-                      "bubble": bubble_sort,
-                      "quick" : quick_sort,
-                      "merge" : merge_sort,
-                      "timsort": tim_sort }
-    
-    for k, v in sorting_algos.items():    
+    for k, v in SORTING_ALGOS.items():    
         perform_sort(k, v)
+        
+    print "Sorting a list made of %d sorted runs:" % NUM_RUNS
+    
+    for k in [ "insertion", "merge", "timsort" ]:
+        perform_sort(k, SORTING_ALGOS[k], generate_runs_list)
 
 if __name__ == "__main__":
     
@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016 Felipe Gallego. All rights reserved.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmark of the algorithms of sorting.py for several sizes and shapes of
+the input. Results are saved as JSON to compare them between runs.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import math
+import platform
+import random
+import sys
+import time
+import timeit
+
+import sorting
+
+NUM_ARGS = 2
+
+SIZES = [ 100, 1000, 10000 ]
+SHAPES = [ "random", "sorted", "reversed", "few_unique", "organ_pipe",
+           "nearly_sorted" ]
+
+WARMUP_RUNS = 1
+REPEAT_RUNS = 5
+
+# Quadratic algorithms are only run up to this size.
+QUADRATIC_ALGOS = [ "selection", "insertion", "bubble" ]
+MAX_QUADRATIC_SIZE = 2000
+
+# Algorithms that only write items in the list given, so all their moves are
+# counted. The other ones also write in buffers of their own that aren't
+# counted.
+IN_PLACE_ALGOS = [ "selection", "insertion", "bubble", "intro" ]
+
+FEW_UNIQUE_VALUES = 10
+NEARLY_SORTED_SWAPS = 0.01
+
+# A median time this much slower than the baseline is a regression.
+REGRESSION_THRESHOLD = 0.10
+
+CLOCK_MONOTONIC_RAW = 4
+
+class _Timespec(ctypes.Structure):
+
+    _fields_ = [ ("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long) ]
+
+def _monotonic_clock():
+    """The best monotonic clock available, time.perf_counter or, as it
+    doesn't exist in Python 2, clock_gettime from the C library.
+    """
+
+    if hasattr(time, "perf_counter"):
+        return time.perf_counter
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        clock_gettime = libc.clock_gettime
+    except (OSError, AttributeError, TypeError):
+        return timeit.default_timer
+
+    clock_gettime.argtypes = [ ctypes.c_int, ctypes.POINTER(_Timespec) ]
+
+    def clock():
+
+        ts = _Timespec()
+
+        if clock_gettime(CLOCK_MONOTONIC_RAW, ctypes.byref(ts)):
+            raise OSError(ctypes.get_errno(), "clock_gettime failed")
+
+        return ts.tv_sec + ts.tv_nsec * 1e-9
+
+    return clock
+
+clock = _monotonic_clock()
+
+class CountedInt(int):
+    """Integer that counts the comparisons done with it."""
+
+    comparisons = 0
+
+    def __lt__(self, other):
+        CountedInt.comparisons += 1
+        return int(self) < int(other)
+
+    def __le__(self, other):
+        CountedInt.comparisons += 1
+        return int(self) <= int(other)
+
+    def __gt__(self, other):
+        CountedInt.comparisons += 1
+        return int(self) > int(other)
+
+    def __ge__(self, other):
+        CountedInt.comparisons += 1
+        return int(self) >= int(other)
+
+    def __eq__(self, other):
+        CountedInt.comparisons += 1
+        return int(self) == int(other)
+
+    def __ne__(self, other):
+        CountedInt.comparisons += 1
+        return int(self) != int(other)
+
+    __hash__ = int.__hash__
+
+class CountingList(list):
+    """List that counts the items written in it."""
+
+    def __init__(self, *args):
+
+        list.__init__(self, *args)
+
+        self.moves = 0
+
+    def __setitem__(self, idx, value):
+
+        if isinstance(idx, slice):
+            value = list(value)
+            self.moves += len(value)
+        else:
+            self.moves += 1
+
+        list.__setitem__(self, idx, value)
+
+    def __setslice__(self, i, j, value):
+
+        value = list(value)
+        self.moves += len(value)
+
+        list.__setslice__(self, i, j, value)
+
+def generate_input(shape, n, seed=sorting.THE_SEED):
+    """A list of n integers in [0, 10 * n) with the shape given."""
+
+    rnd = random.Random(seed)
+    mult = 10 * n
+
+    if shape == "few_unique":
+        values = [ rnd.randrange(mult) for _ in range(FEW_UNIQUE_VALUES) ]
+        return [ rnd.choice(values) for _ in xrange(n) ]
+
+    the_list = [ rnd.randrange(mult) for _ in xrange(n) ]
+
+    if shape == "random":
+        pass
+    elif shape == "sorted":
+        the_list.sort()
+    elif shape == "reversed":
+        the_list.sort(reverse=True)
+    elif shape == "organ_pipe":
+        the_list.sort()
+        the_list = the_list[::2] + the_list[1::2][::-1]
+    elif shape == "nearly_sorted":
+        the_list.sort()
+        for _ in xrange(int(n * NEARLY_SORTED_SWAPS) if n > 1 else 0):
+            i = rnd.randrange(n)
+            j = rnd.randrange(n)
+            the_list[i], the_list[j] = the_list[j], the_list[i]
+    else:
+        raise ValueError("Unknown input shape: %s" % shape)
+
+    return the_list
+
+def time_stats(times):
+    """Minimum, median, mean and sample standard deviation of the times."""
+
+    ordered = sorted(times)
+    n = len(ordered)
+
+    if n % 2:
+        median = ordered[n / 2]
+    else:
+        median = (ordered[n / 2 - 1] + ordered[n / 2]) / 2.0
+
+    mean = sum(ordered) / float(n)
+
+    if n > 1:
+        stddev = math.sqrt(sum((t - mean) ** 2 for t in ordered) / (n - 1))
+    else:
+        stddev = 0.0
+
+    return { "min": ordered[0], "median": median, "mean": mean,
+             "stddev": stddev, "runs": n }
+
+def count_operations(sort_fun, the_list, all_moves=False):
+    """Comparisons and moves of one run of sort_fun. Only the items written
+    in the list given are counted, input_moves, and they are all the moves
+    when all_moves says that sort_fun writes in no other buffer. Otherwise
+    moves is None and moves_complete False, so a partial count isn't
+    compared with the complete ones.
+    """
+
+    counted = CountingList(CountedInt(x) for x in the_list)
+
+    CountedInt.comparisons = 0
+
+    list_sorted, nops = sort_fun(counted)
+
+    in_place = list_sorted is counted
+    moves_complete = all_moves and in_place
+
+    return { "comparisons": CountedInt.comparisons,
+             "moves": counted.moves if moves_complete else None,
+             "input_moves": counted.moves if in_place else None,
+             "moves_complete": moves_complete,
+             "nops": nops,
+             "in_place": in_place,
+             "ok": list(list_sorted) == sorted(the_list) }
+
+def benchmark_sort(sort_fun, the_list, warmup=WARMUP_RUNS,
+                   repeat=REPEAT_RUNS):
+    """Time repeat runs of sort_fun, after warmup runs, with a fresh copy of
+    the list in every run.
+    """
+
+    for _ in range(warmup):
+        sort_fun(list(the_list))
+
+    times = []
+
+    for _ in range(repeat):
+        list_copy = list(the_list)
+
+        start = clock()
+        sort_fun(list_copy)
+        times.append(clock() - start)
+
+    return time_stats(times)
+
+def run_benchmark(algos=None, sizes=SIZES, shapes=SHAPES,
+                  warmup=WARMUP_RUNS, repeat=REPEAT_RUNS, verbose=True):
+    """Benchmark the algorithms named in algos, all the ones of
+    sorting.SORTING_ALGOS by default, for every size and shape.
+    """
+
+    if algos is None:
+        algos = sorted(sorting.SORTING_ALGOS)
+
+    results = []
+
+    for algo in algos:
+        sort_fun = sorting.SORTING_ALGOS[algo]
+
+        for size in sizes:
+            if algo in QUADRATIC_ALGOS and size > MAX_QUADRATIC_SIZE:
+                continue
+
+            for shape in shapes:
+                the_list = generate_input(shape, size)
+
+                res = { "algo": algo, "size": size, "shape": shape }
+
+                try:
+                    res.update(count_operations(sort_fun, the_list,
+                                                algo in IN_PLACE_ALGOS))
+                    res["time"] = benchmark_sort(sort_fun, the_list, warmup,
+                                                 repeat)
+                except RuntimeError as re:
+                    # Recursive algorithms can exceed the recursion limit.
+                    res["error"] = str(re)
+
+                if verbose:
+                    if "error" in res:
+                        print "%-16s %-14s %7d ERROR: %s" % \
+                            (algo, shape, size, res["error"])
+                    else:
+                        print "%-16s %-14s %7d median %.6f s, %d comparisons" % \
+                            (algo, shape, size, res["time"]["median"],
+                             res["comparisons"])
+
+                results.append(res)
+
+    return { "meta": { "python": platform.python_version(),
+                       "platform": platform.platform(),
+                       "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "warmup": warmup,
+                       "repeat": repeat },
+             "results": results }
+
+def save_results(results, file_name):
+
+    with open(file_name, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+def load_results(file_name):
+
+    with open(file_name) as f:
+        return json.load(f)
+
+def find_regressions(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Results of current whose median time is more than threshold slower
+    than the same algorithm, size and shape in baseline, or whose number of
+    comparisons, or of moves when both are complete, has grown.
+    """
+
+    def key(res):
+        return (res["algo"], res["size"], res["shape"])
+
+    base_results = dict((key(res), res) for res in baseline["results"]
+                        if "error" not in res)
+
+    regressions = []
+
+    for res in current["results"]:
+        base = base_results.get(key(res))
+
+        if base is None or "error" in res:
+            continue
+
+        ratio = res["time"]["median"] / base["time"]["median"] \
+            if base["time"]["median"] else 1.0
+
+        more_moves = res.get("moves") is not None and \
+            base.get("moves") is not None and res["moves"] > base["moves"]
+
+        if ratio > 1.0 + threshold or \
+            res["comparisons"] > base["comparisons"] or more_moves:
+            regressions.append((key(res), ratio, base["comparisons"],
+                                res["comparisons"], base.get("moves"),
+                                res.get("moves")))
+
+    return regressions
+
+def main(output_file, baseline_file=None):
+
+    results = run_benchmark()
+
+    save_results(results, output_file)
+
+    print "Results saved to %s" % output_file
+
+    if baseline_file:
+        regressions = find_regressions(load_results(baseline_file), results)
+
+        for (algo, size, shape), ratio, base_cmp, cur_cmp, base_moves, \
+            cur_moves in regressions:
+            print "REGRESSION %s %s %d: %.2fx time, comparisons %d -> %d, " \
+                "moves %s -> %s" % (algo, shape, size, ratio, base_cmp,
+                                    cur_cmp, base_moves, cur_moves)
+
+        print "%d regressions against %s" % (len(regressions), baseline_file)
+
+        return 1 if regressions else 0
+
+    return 0
+
+if __name__ == "__main__":
+
+    if len(sys.argv) < NUM_ARGS:
+        print "ERROR: Use: %s output.json [baseline.json]" % sys.argv[0]
+    else:
+        baseline_file = sys.argv[2] if len(sys.argv) > NUM_ARGS else None
+
+        sys.exit(main(sys.argv[1], baseline_file))
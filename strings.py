@@ -20,6 +20,11 @@
 """
 
 import sys
+import mmap
+import struct
+import tempfile
+
+from array import array
 
 STR_1 = 'ABCDEFGFGFHIJK'
 SUBSTR_1 = 'FGFH'
@@ -27,6 +32,17 @@ SUBSTR_1 = 'FGFH'
 NUM_ARGS = 3
 ARGS_LCST = 4 
 
+# Characters read at a time by the streaming searches.
+STREAM_CHUNK_SIZE = 1 << 20
+
+# Serialized Aho-Corasick automatons: magic, if the patterns are unicode, 
+# number of states, of transitions, of outputs and of patterns, followed by 
+# the tables as little endian 64 bits integers and the characters of the 
+# transitions.
+AC_MAGIC = "AHOCORA1"
+AC_HEADER_FORMAT = "<8sBQQQQ"
+AC_INT_TYPECODE = 'l'
+
 def do_reverse(s):
     
     rev_list = [ s[i] for i in range(len(s) - 1, -1, -1) ]
@@ -75,51 +91,556 @@ def is_anagram(s1, s2):
     return is_anag
 
 # Looking for repeated substrings in a string.
+def _chunks(source, chunk_size):
+    """Chunks of source, sliced from its beginning if it is a string, a 
+    buffer or a mmap, read from its current position if it is a file object.
+    A mmap has a read method too, but it is sliced so its position isn't 
+    moved and it can be searched again.
+    """
+    
+    if isinstance(source, (mmap.mmap, buffer, basestring)) or \
+        not hasattr(source, "read"):
+        for start in xrange(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+    else:
+        chunk = source.read(chunk_size)
+        
+        while chunk:
+            yield chunk
+            chunk = source.read(chunk_size)
+
+def kmp_table(pattern):
+    """Partial match table of pattern, the length of the longest proper 
+    prefix of pattern[:i + 1] that is also a suffix of it for every i.
+    """
+    
+    table = [ 0 ] * len(pattern)
+    k = 0
+    
+    for i in range(1, len(pattern)):
+        while k and pattern[i] != pattern[k]:
+            k = table[k - 1]
+            
+        if pattern[i] == pattern[k]:
+            k += 1
+            
+        table[i] = k
+        
+    return table
+
+class KMPMatcher(object):
+    """Reference:https://en.wikipedia.org/wiki/Knuth%E2%80%93Morris%E2%80%93Pratt_algorithm
+    
+    Search of a pattern with its partial match table, computed once for all
+    the texts. Texts are read in chunks and the length of the prefix of the 
+    pattern matched at the end of a chunk is kept for the next one, so the 
+    matches across chunks are found.
+    """
+    
+    def __init__(self, pattern):
+        
+        if not pattern:
+            raise ValueError("The pattern can't be empty")
+        
+        self.pattern = pattern
+        self.table = kmp_table(pattern)
+        
+    def _scan(self, chunk, k, offset, matches):
+        """Append to matches the offsets of the matches that end in chunk, 
+        that begins at offset of the text with k characters of the pattern 
+        matched. Returns the characters matched at the end of chunk.
+        """
+        
+        pattern = self.pattern
+        table = self.table
+        m = len(pattern)
+        first = pattern[0]
+        
+        i = 0
+        n = len(chunk)
+        
+        while i < n:
+            # Nothing matched, jump to the next first character.
+            if not k:
+                i = chunk.find(first, i)
+                
+                if i < 0:
+                    break
+                
+            c = chunk[i]
+            
+            while k and c != pattern[k]:
+                k = table[k - 1]
+                
+            if c == pattern[k]:
+                k += 1
+                
+                if k == m:
+                    matches.append(offset + i - m + 1)
+                    k = table[k - 1]
+                    
+            i += 1
+            
+        return k
+    
+    def stream(self, source, chunk_size=STREAM_CHUNK_SIZE):
+        """Generator of the offsets of all the matches, overlapping ones too, 
+        in source, a string, a buffer as a mmap or a file object read in 
+        chunks of chunk_size.
+        """
+        
+        k = 0
+        offset = 0
+        
+        for chunk in _chunks(source, chunk_size):
+            matches = []
+            
+            k = self._scan(chunk, k, offset, matches)
+            offset += len(chunk)
+            
+            for match in matches:
+                yield match
+                
+    def find_all(self, text):
+        
+        return self.stream(text)
+    
+    def search(self, text):
+        """Offset of the first match in text, -1 if there isn't any."""
+        
+        return next(self.find_all(text), -1)
+    
+def find_all(s, subs):
+    """Generator of the offsets of all the occurrences of subs in s."""
+    
+    return KMPMatcher(subs).find_all(s)
+
 def Knuth_Morris_Pratt(s, subs):
     """Reference:https://en.wikipedia.org/wiki/Knuth%E2%80%93Morris%E2%80%93Pratt_algorithm
     
-    Without partial match table.
+    Offset of the first occurrence of subs in s, -1 if there isn't any.
     """ 
     
-    s_idx = subs_idx = 0
+    if not subs:
+        return 0
     
-    while s_idx + subs_idx < len(s) - 1:
-        if subs[subs_idx] == s[s_idx + subs_idx]:
-            if subs_idx == len(subs) - 1:
-                return s_idx 
-            subs_idx += 1
+    return KMPMatcher(subs).search(s)
+
+class AhoCorasick(object):
+    """Reference: https://en.wikipedia.org/wiki/Aho%E2%80%93Corasick_algorithm
+    
+    Automaton that finds all the occurrences of a set of patterns in one pass 
+    over the text. The states are the prefixes of the patterns numbered in 
+    breadth first order, and the tables are arrays of integers:
+    - The transitions of state s are from _edge_start[s] to 
+      _edge_start[s + 1], their characters in _edge_chars, sorted, and their
+      states in _edge_targets.
+    - _fail is the state of the longest proper suffix of every state that is 
+      a prefix of a pattern, followed when there isn't a transition.
+    - _dict_link is the next state through the fail links with patterns.
+    - The ids of the patterns of state s are from _out_start[s] to 
+      _out_start[s + 1] of _out_ids.
+    """
+    
+    def __init__(self, patterns):
+        
+        patterns = list(patterns)
+        
+        if not all(patterns):
+            raise ValueError("The patterns can't be empty")
+        
+        # Trie with dicts, only while the automaton is built.
+        goto = [ {} ]
+        out = [ [] ]
+        
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            
+            for c in pattern:
+                nxt = goto[state].get(c)
+                
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][c] = nxt
+                    goto.append({})
+                    out.append([])
+                    
+                state = nxt
+                
+            out[state].append(pattern_id)
+            
+        # Breadth first order, the fail state is always before.
+        order = [ 0 ]
+        for state in order:
+            order.extend(goto[state][c] for c in sorted(goto[state]))
+            
+        fail = [ 0 ] * len(goto)
+        dict_link = [ 0 ] * len(goto)
+        
+        for state in order:
+            for c, nxt in goto[state].iteritems():
+                if state:
+                    f = fail[state]
+                    while f and c not in goto[f]:
+                        f = fail[f]
+                    fail[nxt] = goto[f].get(c, 0)
+                    
+                f = fail[nxt]
+                dict_link[nxt] = f if out[f] else dict_link[f]
+                
+        # The arrays with the states renumbered.
+        new_id = [ 0 ] * len(goto)
+        for i, state in enumerate(order):
+            new_id[state] = i
+            
+        edge_start = array(AC_INT_TYPECODE, [ 0 ])
+        edge_chars = []
+        edge_targets = array(AC_INT_TYPECODE)
+        out_start = array(AC_INT_TYPECODE, [ 0 ])
+        out_ids = array(AC_INT_TYPECODE)
+        
+        for state in order:
+            for c in sorted(goto[state]):
+                edge_chars.append(c)
+                edge_targets.append(new_id[goto[state][c]])
+                
+            edge_start.append(len(edge_targets))
+            
+            out_ids.extend(out[state])
+            out_start.append(len(out_ids))
+            
+        self._is_unicode = any(isinstance(p, unicode) for p in patterns)
+        
+        self._edge_start = edge_start
+        self._edge_chars = (u'' if self._is_unicode else '').join(edge_chars)
+        self._edge_targets = edge_targets
+        self._fail = array(AC_INT_TYPECODE, 
+                           (new_id[fail[state]] for state in order))
+        self._dict_link = array(AC_INT_TYPECODE, 
+                                (new_id[dict_link[state]] for state in order))
+        self._out_start = out_start
+        self._out_ids = out_ids
+        self._lengths = array(AC_INT_TYPECODE, (len(p) for p in patterns))
+        
+    @property
+    def num_states(self):
+        
+        return len(self._fail)
+    
+    @property
+    def num_patterns(self):
+        
+        return len(self._lengths)
+    
+    def _scan(self, chunk, state, offset, matches):
+        """Append to matches the (offset, pattern_id) of the matches that end
+        in chunk, that begins at offset of the text in state. Returns the 
+        state at the end of chunk.
+        """
+        
+        edge_start = self._edge_start
+        edge_chars = self._edge_chars
+        edge_targets = self._edge_targets
+        fail = self._fail
+        dict_link = self._dict_link
+        out_start = self._out_start
+        out_ids = self._out_ids
+        lengths = self._lengths
+        
+        for i, c in enumerate(chunk):
+            while True:
+                j = edge_chars.find(c, edge_start[state], 
+                                    edge_start[state + 1])
+                
+                if j >= 0:
+                    state = edge_targets[j]
+                    break
+                
+                if not state:
+                    break
+                
+                state = fail[state]
+                
+            # The patterns of the state and of its suffixes.
+            s = state if out_start[state] < out_start[state + 1] \
+                else dict_link[state]
+            
+            while s:
+                for k in xrange(out_start[s], out_start[s + 1]):
+                    pattern_id = out_ids[k]
+                    matches.append((offset + i - lengths[pattern_id] + 1, 
+                                    pattern_id))
+                    
+                s = dict_link[s]
+                
+        return state
+    
+    def stream(self, source, chunk_size=STREAM_CHUNK_SIZE):
+        """Generator of the (offset, pattern_id) of all the matches in source,
+        a string, a buffer as a mmap or a file object read in chunks of 
+        chunk_size, in the order they end. The state at the end of a chunk 
+        is kept for the next one.
+        """
+        
+        state = 0
+        offset = 0
+        
+        for chunk in _chunks(source, chunk_size):
+            matches = []
+            
+            state = self._scan(chunk, state, offset, matches)
+            offset += len(chunk)
+            
+            for match in matches:
+                yield match
+                
+    def find_all(self, text):
+        
+        return self.stream(text)
+    
+    def dumps(self):
+        """The automaton as a string, to rebuild it with loads."""
+        
+        if self._is_unicode:
+            chars = self._edge_chars.encode("utf-32-le")
         else:
-            subs_idx = 0
-            s_idx += 1
+            chars = self._edge_chars
+            
+        tables = [ self._edge_start, self._edge_targets, self._fail, 
+                   self._dict_link, self._out_start, self._out_ids, 
+                   self._lengths ]
+        
+        parts = [ struct.pack(AC_HEADER_FORMAT, AC_MAGIC, self._is_unicode, 
+                              self.num_states, len(self._edge_targets), 
+                              len(self._out_ids), self.num_patterns) ]
+        
+        parts.extend(struct.pack("<%dq" % len(table), *table) 
+                     for table in tables)
+        parts.append(chars)
+        
+        return ''.join(parts)
+    
+    @classmethod
+    def loads(cls, data):
+        
+        magic, is_unicode, num_states, num_edges, num_out, num_patterns = \
+            struct.unpack_from(AC_HEADER_FORMAT, data)
+            
+        if magic != AC_MAGIC:
+            raise ValueError("The data isn't an Aho-Corasick automaton")
+        
+        automaton = cls.__new__(cls)
+        automaton._is_unicode = bool(is_unicode)
+        
+        pos = struct.calcsize(AC_HEADER_FORMAT)
+        tables = []
+        
+        for size in [ num_states + 1, num_edges, num_states, num_states, 
+                      num_states + 1, num_out, num_patterns ]:
+            fmt = "<%dq" % size
+            tables.append(array(AC_INT_TYPECODE, 
+                                struct.unpack_from(fmt, data, pos)))
+            pos += struct.calcsize(fmt)
+            
+        automaton._edge_start, automaton._edge_targets, automaton._fail, \
+            automaton._dict_link, automaton._out_start, automaton._out_ids, \
+            automaton._lengths = tables
+            
+        chars = data[pos:]
+        automaton._edge_chars = chars.decode("utf-32-le") if is_unicode \
+            else chars
+        
+        return automaton
     
-    return -1
+    def save(self, file_name):
+        
+        with open(file_name, 'wb') as f:
+            f.write(self.dumps())
+            
+    @classmethod
+    def load(cls, file_name):
+        
+        with open(file_name, 'rb') as f:
+            return cls.loads(f.read())
 
-def longest_common_substring(s1, s2):
-    """Reference:https://en.wikipedia.org/wiki/Longest_common_substring_problem
-    """
+class SuffixAutomaton(object):
+    """Reference: https://en.wikipedia.org/wiki/Suffix_automaton
     
-    len_s1 = len(s1)
-    len_s2 = len(s2)    
-    m = [ [0  for _ in range(len_s2) ] for _ in range(len_s1) ]
-    greatest_len = 0
-    common_str = ''
+    Smallest automaton that accepts the suffixes of a string, built in linear
+    time. Every state is a class of substrings with the same end positions, 
+    the suffixes of its longest one with lengths greater than the length of
+    the state of its suffix link. first_end is the end of the first 
+    occurrence of the substrings of every state.
+    """
     
-    for i in range(len_s1):
-        for j in range(len_s2):
-            if s1[i] == s2[j]:
+    def __init__(self, s):
+        
+        self.s = s
+        self.length = [ 0 ]
+        self.link = [ -1 ]
+        self.next = [ {} ]
+        self.first_end = [ -1 ]
+        
+        last = 0
+        
+        for i, c in enumerate(s):
+            cur = self._new_state(self.length[last] + 1, i)
+            
+            p = last
+            while p != -1 and c not in self.next[p]:
+                self.next[p][c] = cur
+                p = self.link[p]
+                
+            if p == -1:
+                self.link[cur] = 0
+            else:
+                q = self.next[p][c]
                 
-                if i == 1 or j == 1:
-                    m[i][j] = 1
+                if self.length[p] + 1 == self.length[q]:
+                    self.link[cur] = q
                 else:
-                    m[i][j] = m[i-1][j-1] + 1
+                    # Split q, the shorter substrings go to a clone.
+                    clone = self._new_state(self.length[p] + 1, 
+                                            self.first_end[q])
+                    self.next[clone] = dict(self.next[q])
+                    self.link[clone] = self.link[q]
                     
-                if m[i][j] > greatest_len:
-                    greatest_len = m[i][j]
-                    common_str = s1[i-greatest_len+1:i+1] 
-                elif m[i][j] == greatest_len:
-                    common_str = common_str + s1[i-greatest_len+1:i+1]
+                    while p != -1 and self.next[p].get(c) == q:
+                        self.next[p][c] = clone
+                        p = self.link[p]
+                        
+                    self.link[q] = self.link[cur] = clone
                     
-    return common_str
+            last = cur
+            
+    def _new_state(self, length, first_end):
+        
+        self.length.append(length)
+        self.link.append(-1)
+        self.next.append({})
+        self.first_end.append(first_end)
+        
+        return len(self.length) - 1
+    
+    def states_by_length(self):
+        """States from the longest to the shortest, sorted by counting."""
+        
+        buckets = [ 0 ] * (len(self.s) + 2)
+        for length in self.length:
+            buckets[length + 1] += 1
+        for i in range(1, len(buckets)):
+            buckets[i] += buckets[i - 1]
+            
+        order = [ 0 ] * len(self.length)
+        for state, length in enumerate(self.length):
+            order[buckets[length]] = state
+            buckets[length] += 1
+            
+        order.reverse()
+        
+        return order
+    
+    def match(self, t, order=None):
+        """For every state, the length of the longest of its substrings that
+        is in t, and the end in t of an occurrence of it.
+        """
+        
+        length = self.length
+        link = self.link
+        nxt = self.next
+        
+        best = [ 0 ] * len(length)
+        end = [ -1 ] * len(length)
+        
+        state = 0
+        matched = 0
+        
+        for i, c in enumerate(t):
+            # The longest suffix of the match that can be extended with c.
+            while state and c not in nxt[state]:
+                state = link[state]
+                matched = length[state]
+                
+            if c in nxt[state]:
+                state = nxt[state][c]
+                matched += 1
+            else:
+                state = matched = 0
+                
+            if matched > best[state]:
+                best[state] = matched
+                end[state] = i
+                
+        # The suffixes of a match are matches too, whole in the states of 
+        # the suffix links.
+        for state in order or self.states_by_length():
+            p = link[state]
+            
+            if best[state] and p > 0 and best[p] < length[p]:
+                best[p] = length[p]
+                end[p] = end[state]
+                
+        return best, end
+    
+def longest_common_substrings(*strings):
+    """Reference: https://en.wikipedia.org/wiki/Longest_common_substring_problem
+    
+    All the distinct longest common substrings of the strings, each one with
+    the offsets of an occurrence of it in every string, in the order of 
+    their first occurrence in the shortest string. The suffix automaton of 
+    the shortest string is matched with every other string, keeping the 
+    lowest match of every state, in linear time and memory.
+    """
+    
+    if not strings:
+        raise ValueError("At least a string is needed")
+    
+    base = min(range(len(strings)), key=lambda i: len(strings[i]))
+    automaton = SuffixAutomaton(strings[base])
+    order = automaton.states_by_length()
+    
+    # Lowest match of every state and the ends of its matches.
+    common = list(automaton.length)
+    ends = [ None ] * len(strings)
+    
+    for i, t in enumerate(strings):
+        if i != base:
+            best, ends[i] = automaton.match(t, order)
+            common = [ min(a, b) for a, b in zip(common, best) ]
+            
+    longest = max(common)
+    
+    if not longest:
+        return []
+    
+    result = []
+    
+    for state in sorted((state for state, length in enumerate(common) 
+                         if length == longest), 
+                        key=lambda state: automaton.first_end[state]):
+        offsets = []
+        
+        for i in range(len(strings)):
+            if i == base:
+                offsets.append(automaton.first_end[state] - longest + 1)
+            else:
+                offsets.append(ends[i][state] - longest + 1)
+                
+        first = offsets[base]
+        result.append((strings[base][first:first + longest], tuple(offsets)))
+        
+    return result
+
+def longest_common_substring(s1, s2):
+    """Reference:https://en.wikipedia.org/wiki/Longest_common_substring_problem
+    
+    The first of the longest common substrings of s1 and s2, see 
+    longest_common_substrings.
+    """
+    
+    substrings = longest_common_substrings(s1, s2)
+    
+    return substrings[0][0] if substrings else ''
     
 if __name__ == "__main__":
     
@@ -141,8 +662,48 @@ if __name__ == "__main__":
         
         print "%s and %s are anagrams: %s" % (s1, s2, is_anagram(s1, s2))
                 
-        print "A substring of %s in %s (with Knuth-Morris-Pratt) is at: %d" % \
-            (s1, s2, Knuth_Morris_Pratt(s1, s2))
+        print "%s in %s (with Knuth-Morris-Pratt) is at: %d" % \
+            (s2, s1, Knuth_Morris_Pratt(s1, s2))
+        
+        print "All the occurrences of %s in %s are at: %s" % \
+            (s2, s1, list(find_all(s1, s2)))
+        
+        patterns = sys.argv[2:]
+        
+        print "Occurrences of %s in %s (with Aho-Corasick): %s" % \
+            (', '.join(patterns), s1, 
+             [ (offset, patterns[pattern_id]) 
+               for offset, pattern_id in AhoCorasick(patterns).find_all(s1) ])
         
         print "Longest common substring of %s and %s is: %s" % \
-            (s1, s2, longest_common_substring(s1, s2))
\ No newline at end of file
+            (s1, s2, longest_common_substring(s1, s2))
+        
+        print "Longest common substrings of %s, with their offsets: %s" % \
+            (', '.join(sys.argv[1:]), longest_common_substrings(*sys.argv[1:]))
+        
+        # The searches in a mmap of s1 don't depend on the previous ones.
+        if s1:
+            tmp = tempfile.TemporaryFile()
+            tmp.write(s1)
+            tmp.flush()
+            
+            mm = mmap.mmap(tmp.fileno(), 0, access=mmap.ACCESS_READ)
+            
+            matcher = KMPMatcher(s2)
+            matches = list(matcher.find_all(mm))
+            
+            print "Searching %s twice in a mmap of %s gives the same " \
+                "matches: %s" % \
+                (s2, s1, list(matcher.find_all(mm)) == matches and 
+                 matcher.search(mm) == (matches[0] if matches else -1))
+            
+            automaton = AhoCorasick(patterns)
+            matches = list(automaton.stream(mm))
+            
+            print "Streaming %s twice from a mmap of %s (with Aho-Corasick) " \
+                "gives the same matches: %s" % \
+                (', '.join(patterns), s1, 
+                 list(automaton.stream(mm)) == matches)
+            
+            mm.close()
+            tmp.close()
\ No newline at end of file